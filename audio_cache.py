@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Disková cache vygenerovaného audia (text-to-speech).
+Kľúčom je hash textu, TTS enginu, hlasu, štýlu a modelu, takže opakovaný
+podcast z rovnakého textu sa vráti z disku bez novej syntézy.
+"""
+
+import os
+import logging
+from typing import Dict, Any, Optional
+
+from cache_store import SqliteCache
+from single_flight import make_key
+
+logger = logging.getLogger(__name__)
+
+AUDIO_CACHE_TTL = int(os.environ.get('AUDIO_CACHE_TTL', 30 * 24 * 3600))
+AUDIO_CACHE_MAX_MB = int(os.environ.get('AUDIO_CACHE_MAX_MB', 500))
+
+cache = SqliteCache(
+    'audio',
+    max_bytes=AUDIO_CACHE_MAX_MB * 1024 * 1024,
+    ttl=AUDIO_CACHE_TTL
+)
+
+
+def audio_key(text: str, engine: str, voice: str, style: str, model: str) -> str:
+    """Vytvorí kľúč z textu a parametrov syntézy."""
+    return make_key(text, engine, voice, style, model)
+
+
+def lookup(key: str) -> Optional[bytes]:
+    """Vráti MP3 dáta z cache alebo None."""
+    audio_data, _ = cache.get(key)
+    return audio_data
+
+
+def store(key: str, audio_data: bytes):
+    """Uloží MP3 dáta do cache."""
+    if audio_data:
+        cache.set(key, audio_data)
+
+
+def stats() -> Dict[str, Any]:
+    """Vráti štatistiky cache audia."""
+    return cache.stats()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Jeden dlhožijúci event loop v samostatnom vlákne pre synchrónne Flask handlery.
+Namiesto asyncio.run() pri každej požiadavke sa korutiny posielajú do tejto
+slučky, takže všetky požiadavky workera zdieľajú jednu aiohttp session,
+zoskupovanie transkriptov a desiatky súbežných volaní na externé služby.
+"""
+
+import os
+import atexit
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+
+import http_client
+
+logger = logging.getLogger(__name__)
+
+_loop = None
+_loop_pid = None
+_lock = threading.Lock()
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop):
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Vráti bežiacu slučku na pozadí, pri prvom volaní (alebo po fork-e) ju spustí."""
+    global _loop, _loop_pid
+
+    if _loop is not None and _loop_pid == os.getpid():
+        return _loop
+
+    with _lock:
+        if _loop is None or _loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_run_loop, args=(loop,), name="background-loop", daemon=True)
+            thread.start()
+            _loop = loop
+            _loop_pid = os.getpid()
+            logger.info("Spustený event loop na pozadí")
+    return _loop
+
+
+def submit(coro: Awaitable) -> concurrent.futures.Future:
+    """Naplánuje korutinu v slučke na pozadí a vráti concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro: Awaitable, timeout: Optional[float] = None) -> Any:
+    """
+    Spustí korutinu v slučke na pozadí a počká na jej výsledok.
+
+    Args:
+        coro: Korutina, ktorá sa má vykonať
+        timeout: Maximálny čas čakania v sekundách (po jeho uplynutí sa korutina zruší)
+
+    Returns:
+        Výsledok korutiny
+    """
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()
+        raise
+
+
+def iterate(agen: AsyncIterator) -> Iterator:
+    """
+    Prechádza asynchrónny generátor zo synchrónneho kódu, položky počíta slučka na pozadí.
+    Ak volajúci prestane čítať, generátor sa zatvorí (a jeho rozpracované úlohy zrušia).
+    """
+    loop = get_loop()
+    try:
+        while True:
+            try:
+                item = asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
+
+
+def stop():
+    """Zatvorí zdieľanú aiohttp session a zastaví slučku na pozadí."""
+    global _loop
+
+    with _lock:
+        loop, _loop = _loop, None
+    if loop is None or _loop_pid != os.getpid() or not loop.is_running():
+        return
+
+    try:
+        asyncio.run_coroutine_threadsafe(http_client.close_async_session(), loop).result(5)
+    except Exception as e:
+        logger.warning(f"Nepodarilo sa zatvoriť HTTP session slučky na pozadí: {e}")
+    loop.call_soon_threadsafe(loop.stop)
+
+
+atexit.register(stop)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Webhook režim Telegram bota.
+Telegram posiela aktualizácie na HTTP endpoint, ktorý ich len zaradí do fronty
+aplikácie a hneď odpovie; spracovanie beží súbežne (BOT_CONCURRENT_UPDATES).
+Endpoint môže bežať ako samostatný aiohttp server alebo v procese Flask aplikácie.
+Vo Flask režime obsluhuje bota len jeden proces (bot drží transkripty v pamäti),
+webhook sa v Telegrame registruje raz pri nasadení: python bot_webhook.py set
+"""
+
+import os
+import sys
+import hmac
+import atexit
+import asyncio
+import logging
+import argparse
+import threading
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+import http_client
+import background_loop
+from cache_store import CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Verejná adresa, na ktorú má Telegram posielať aktualizácie (bez cesty), a cesta endpointu
+BOT_WEBHOOK_URL = os.environ.get('BOT_WEBHOOK_URL', '').rstrip('/')
+BOT_WEBHOOK_PATH = os.environ.get('BOT_WEBHOOK_PATH', '/telegram/webhook')
+BOT_WEBHOOK_SECRET = os.environ.get('BOT_WEBHOOK_SECRET')
+BOT_WEBHOOK_HOST = os.environ.get('BOT_WEBHOOK_HOST', '0.0.0.0')
+BOT_WEBHOOK_PORT = int(os.environ.get('BOT_WEBHOOK_PORT', 8443))
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+def is_authorized(secret: Optional[str]) -> bool:
+    """Overí tajný token, ktorý Telegram posiela v hlavičke (ak je nastavený)."""
+    if not BOT_WEBHOOK_SECRET:
+        return True
+    return secret is not None and hmac.compare_digest(secret, BOT_WEBHOOK_SECRET)
+
+
+async def set_webhook(application: Application):
+    """Zaregistruje webhook v Telegrame (BOT_WEBHOOK_URL + BOT_WEBHOOK_PATH)."""
+    await application.bot.set_webhook(
+        url=f"{BOT_WEBHOOK_URL}{BOT_WEBHOOK_PATH}",
+        secret_token=BOT_WEBHOOK_SECRET,
+        max_connections=100,
+        allowed_updates=Update.ALL_TYPES
+    )
+    logger.info(f"Webhook nastavený na {BOT_WEBHOOK_URL}{BOT_WEBHOOK_PATH}")
+
+
+async def start_application(application: Application, register_webhook: bool = True):
+    """
+    Inicializuje a spustí aplikáciu bota.
+
+    Args:
+        register_webhook: True, ak sa má pri štarte zaregistrovať aj webhook (samostatný server)
+    """
+    await application.initialize()
+    await application.start()
+    if register_webhook and BOT_WEBHOOK_URL:
+        await set_webhook(application)
+
+
+async def stop_application(application: Application):
+    """Zastaví aplikáciu bota a zatvorí jej HTTP spojenia."""
+    await application.stop()
+    await application.shutdown()
+    await http_client.close_async_session()
+
+
+async def handle_update(application: Application, data: Dict[str, Any]):
+    """Zaradí aktualizáciu do fronty aplikácie; spracuje ju niektorý z jej súbežných handlerov."""
+    update = Update.de_json(data, application.bot)
+    if update is not None:
+        await application.update_queue.put(update)
+
+
+def create_web_app(application: Application) -> web.Application:
+    """Vytvorí aiohttp aplikáciu s webhook endpointom a životným cyklom bota."""
+    async def webhook(request: web.Request) -> web.Response:
+        if not is_authorized(request.headers.get(SECRET_HEADER)):
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        await handle_update(application, data)
+        return web.Response()
+
+    async def on_startup(_app: web.Application):
+        await start_application(application)
+
+    async def on_cleanup(_app: web.Application):
+        await stop_application(application)
+
+    web_app = web.Application()
+    web_app.router.add_post(BOT_WEBHOOK_PATH, webhook)
+    web_app.on_startup.append(on_startup)
+    web_app.on_cleanup.append(on_cleanup)
+    return web_app
+
+
+def run_server(application: Application, host: str = BOT_WEBHOOK_HOST, port: int = BOT_WEBHOOK_PORT):
+    """Spustí samostatný webhook server (blokuje až do ukončenia)."""
+    logger.info(f"Webhook server počúva na {host}:{port}{BOT_WEBHOOK_PATH}")
+    web.run_app(create_web_app(application), host=host, port=port, print=None)
+
+
+def _acquire_bot_lock():
+    """
+    Vezme si výhradný zámok na obsluhu bota medzi procesmi na tomto stroji.
+
+    Returns:
+        Otvorený súbor zámku (drží sa po celý beh procesu) alebo None, ak ho má iný proces
+    """
+    handle = open(os.path.join(CACHE_DIR, "bot_webhook.lock"), "w")
+    if fcntl is not None:
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return None
+    return handle
+
+
+def attach_to_flask(flask_app, build_application):
+    """
+    Pridá webhook endpoint do Flask aplikácie.
+    Bot beží v slučke na pozadí a spustí sa pri prvej aktualizácii v procese
+    (aj po fork-e workera), Flask handler len odovzdá aktualizáciu a hneď odpovie.
+
+    Bot drží transkripty pre sumarizáciu v pamäti procesu, preto ho obsluhuje len
+    jeden proces - ten, ktorý získa zámok; ostatné workery vrátia 503 a Telegram
+    aktualizáciu doručí znova. Server treba spúšťať s jedným workerom (napr.
+    gunicorn -w 1 --threads 8). Webhook sa neregistruje pri štarte, ale raz
+    príkazom python bot_webhook.py set.
+    """
+    from flask import request
+
+    state = {"application": None, "pid": None, "lock": None, "warned": False}
+    lock = threading.Lock()
+
+    def shutdown():
+        application = state["application"]
+        if application is not None and state["pid"] == os.getpid():
+            state["application"] = None
+            try:
+                background_loop.run(stop_application(application), timeout=10)
+            except Exception as e:
+                logger.warning(f"Chyba pri zastavení bota: {e}")
+
+    def get_application() -> Optional[Application]:
+        with lock:
+            if state["pid"] != os.getpid():
+                # Po fork-e aplikácia ani zámok rodiča nepatria tomuto procesu
+                state.update(application=None, pid=os.getpid(), lock=None, warned=False)
+            if state["application"] is None:
+                # Zámok skúšame pri každej aktualizácii - ak vlastník skončí, bota prevezme iný proces
+                bot_lock = _acquire_bot_lock()
+                if bot_lock is None:
+                    if not state["warned"]:
+                        logger.error("Webhook bota už obsluhuje iný proces; BOT_WEBHOOK_IN_FLASK vyžaduje jeden worker")
+                        state["warned"] = True
+                    return None
+                application = build_application(webhook=True)
+                try:
+                    background_loop.run(start_application(application, register_webhook=False))
+                except Exception:
+                    bot_lock.close()
+                    raise
+                state.update(application=application, lock=bot_lock)
+                atexit.register(shutdown)
+            return state["application"]
+
+    @flask_app.route(BOT_WEBHOOK_PATH, methods=['POST'])
+    def telegram_webhook():
+        if not is_authorized(request.headers.get(SECRET_HEADER)):
+            return "", 403
+        data = request.get_json(silent=True)
+        if data is None:
+            return "", 400
+        application = get_application()
+        if application is None:
+            return "", 503
+        background_loop.submit(handle_update(application, data))
+        return "", 200
+
+    return telegram_webhook
+
+
+async def _manage_webhook(command: str):
+    from youtube_transcript_bot import build_application
+
+    application = build_application(webhook=True)
+    async with application.bot:
+        if command == "set":
+            if not BOT_WEBHOOK_URL:
+                raise SystemExit("BOT_WEBHOOK_URL nie je nastavená")
+            await set_webhook(application)
+        elif command == "delete":
+            await application.bot.delete_webhook()
+            logger.info("Webhook zrušený")
+        info = await application.bot.get_webhook_info()
+        print(f"URL: {info.url or '-'}, čakajúce aktualizácie: {info.pending_update_count}, "
+              f"posledná chyba: {info.last_error_message or '-'}")
+    await http_client.close_async_session()
+
+
+def main():
+    """Jednorazová registrácia webhooku pri nasadení (mimo spracovania požiadaviek)."""
+    parser = argparse.ArgumentParser(description="Správa webhooku Telegram bota")
+    parser.add_argument("command", choices=["set", "delete", "info"])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    asyncio.run(_manage_webhook(args.command))
+
+
+if __name__ == '__main__':
+    main()
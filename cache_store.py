@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Perzistentné úložisko cache v jednom SQLite súbore.
+Súbor môžu zdieľať všetky procesy na jednom stroji (napr. viac gunicorn
+workerov), podporuje TTL, stale-while-revalidate, LRU vyhadzovanie podľa
+celkovej veľkosti a zdieľané počítadlá zásahov.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import tempfile
+import threading
+from typing import Optional, Tuple, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Adresár pre súbory cache (na Verceli je zapisovateľný len /tmp)
+CACHE_DIR = os.environ.get('CACHE_DIR', tempfile.gettempdir())
+
+# Stavy záznamu vracané z SqliteCache.get()
+FRESH = 'fresh'
+STALE = 'stale'
+
+# Ako často (v sekundách) čítanie zapisuje čas prístupu a počítadlá zásahov;
+# väčšina zásahov tak nepotrebuje zápisový zámok zdieľaný všetkými workermi
+CACHE_ACCESS_WRITE_INTERVAL = float(os.environ.get('CACHE_ACCESS_WRITE_INTERVAL', '60'))
+
+
+class SqliteCache:
+    """Kľúč-hodnota cache s binárnymi hodnotami uloženými v SQLite."""
+
+    def __init__(self, name: str, max_bytes: int, ttl: float, stale_ttl: float = 0, path: Optional[str] = None):
+        """
+        Args:
+            name: Názov cache (použije sa aj ako názov súboru)
+            max_bytes: Maximálna celková veľkosť hodnôt, nad ňou sa vyhadzujú najdlhšie nepoužité záznamy
+            ttl: Predvolená doba platnosti záznamu v sekundách
+            stale_ttl: Ako dlho po expirácii sa ešte smie vrátiť zastaraný záznam
+            path: Voliteľná cesta k súboru, inak CACHE_DIR/<name>.sqlite3
+        """
+        self.name = name
+        self.path = path or os.path.join(CACHE_DIR, f"{name}.sqlite3")
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._local = threading.local()
+        # Počítadlá zásahov z čítania, ktoré ešte nie sú zapísané v tabuľke stats
+        self._counts_lock = threading.Lock()
+        self._pending_counts: Dict[str, int] = {}
+        self._counts_pid = os.getpid()
+        self._counts_flushed = time.time()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Vráti spojenie pre aktuálne vlákno (a proces - po fork-e sa otvorí nové)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        # WAL umožňuje súbežné čítanie z viacerých procesov počas zápisu
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        conn.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _count(conn: sqlite3.Connection, name: str, amount: int = 1):
+        conn.execute(
+            "INSERT INTO stats (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def _take_counts(self, now: float) -> Dict[str, int]:
+        """Vráti a vynuluje nezapísané počítadlá (volať so zámkom _counts_lock)."""
+        if self._counts_pid != os.getpid():
+            # Po fork-e patria počítadlá rodičovskému procesu
+            self._pending_counts = {}
+            self._counts_pid = os.getpid()
+        pending = self._pending_counts
+        self._pending_counts = {}
+        self._counts_flushed = now
+        return pending
+
+    def _record(self, conn: sqlite3.Connection, name: str, now: float, touch_key: Optional[str] = None):
+        """
+        Započíta výsledok čítania v pamäti; do databázy ho zapíše len raz za
+        CACHE_ACCESS_WRITE_INTERVAL alebo spolu s obnovením času prístupu.
+
+        Args:
+            conn: Spojenie aktuálneho vlákna
+            name: Názov počítadla
+            now: Aktuálny čas
+            touch_key: Kľúč, ktorému treba obnoviť čas prístupu (pre LRU)
+        """
+        with self._counts_lock:
+            if self._counts_pid != os.getpid():
+                self._take_counts(now)
+            self._pending_counts[name] = self._pending_counts.get(name, 0) + 1
+            if touch_key is None and now - self._counts_flushed < CACHE_ACCESS_WRITE_INTERVAL:
+                return
+            pending = self._take_counts(now)
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if touch_key is not None:
+                    conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, touch_key))
+                for counter, amount in pending.items():
+                    self._count(conn, counter, amount)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            # Zásah do cache je platný aj bez zápisu štatistík
+            logger.debug(f"Nepodarilo sa zapísať prístup do cache {self.name}: {e}")
+
+    def _flush_counts(self, conn: sqlite3.Connection):
+        """Zapíše nezapísané počítadlá (volať vo vnútri transakcie)."""
+        with self._counts_lock:
+            pending = self._take_counts(time.time())
+        for name, amount in pending.items():
+            self._count(conn, name, amount)
+
+    def get(self, key: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Načíta hodnotu z cache.
+
+        Returns:
+            Dvojica (hodnota, stav), kde stav je FRESH alebo STALE; (None, None) pri miss
+        """
+        try:
+            conn = self._connect()
+            now = time.time()
+            row = conn.execute("SELECT value, expires, accessed FROM entries WHERE key = ?", (key,)).fetchone()
+
+            if row is None:
+                self._record(conn, 'misses', now)
+                return None, None
+
+            value, expires, accessed = row
+            if now > expires + self.stale_ttl:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._record(conn, 'misses', now)
+                return None, None
+
+            state = FRESH if now <= expires else STALE
+            # Čas prístupu stačí pre LRU obnoviť raz za interval, nie pri každom zásahu
+            touch_key = key if now - accessed >= CACHE_ACCESS_WRITE_INTERVAL else None
+            self._record(conn, 'hits' if state == FRESH else 'stale_hits', now, touch_key)
+            return bytes(value), state
+
+        except sqlite3.Error as e:
+            logger.warning(f"Chyba pri čítaní z cache {self.name}: {e}")
+            return None, None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        """Uloží hodnotu do cache a podľa potreby vyhodí najdlhšie nepoužité záznamy."""
+        size = len(value)
+        if size > self.max_bytes:
+            logger.info(f"Hodnota pre {key} ({size} B) je väčšia ako limit cache {self.name}, neukladám")
+            return
+
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, expires, now)
+                )
+                self._count(conn, 'stores')
+                self._flush_counts(conn)
+                self._evict(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        except sqlite3.Error as e:
+            logger.warning(f"Chyba pri zápise do cache {self.name}: {e}")
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Vyhodí najdlhšie nepoužité záznamy, kým celková veľkosť neklesne pod limit."""
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        to_delete = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC"):
+            to_delete.append((key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+        conn.executemany("DELETE FROM entries WHERE key = ?", to_delete)
+        self._count(conn, 'evictions', len(to_delete))
+
+    def delete(self, key: str):
+        """Odstráni záznam z cache."""
+        try:
+            self._connect().execute("DELETE FROM entries WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"Chyba pri mazaní z cache {self.name}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Vráti počítadlá zásahov a aktuálnu veľkosť cache."""
+        try:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._flush_counts(conn)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            result = {"hits": 0, "stale_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+            result.update(dict(conn.execute("SELECT name, value FROM stats").fetchall()))
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            result.update({"entries": entries, "bytes": size, "max_bytes": self.max_bytes})
+            lookups = result["hits"] + result["stale_hits"] + result["misses"]
+            result["hit_rate"] = round((result["hits"] + result["stale_hits"]) / lookups, 4) if lookups else 0.0
+            return result
+        except sqlite3.Error as e:
+            logger.warning(f"Chyba pri čítaní štatistík cache {self.name}: {e}")
+            return {}
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Spravodlivé plánovanie práce bota medzi chatmi.
+Každý chat má vlastnú frontu, voľné sloty sa prideľujú chatom striedavo
+(round-robin) a jeden chat nemôže mať naraz viac ako per_key_limit úloh,
+takže používateľ s 20 odkazmi nezablokuje ostatných.
+"""
+
+import time
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Set, Tuple
+
+
+class FairScheduler:
+    """Fronty úloh podľa kľúča (chatu) s round-robin prideľovaním obmedzeného počtu slotov."""
+
+    def __init__(self, max_workers: int, per_key_limit: int):
+        """
+        Args:
+            max_workers: Maximálny počet súbežne bežiacich úloh spolu
+            per_key_limit: Maximálny počet súbežne bežiacich úloh jedného kľúča
+        """
+        self.max_workers = max_workers
+        self.per_key_limit = per_key_limit
+        self._queues: Dict[Hashable, Deque[Tuple[Callable[[], Awaitable], asyncio.Future, float]]] = {}
+        # Kľúče, ktoré čakajú na slot, v poradí, v akom prídu na rad
+        self._ready: Deque[Hashable] = deque()
+        self._in_ready: Set[Hashable] = set()
+        self._running: Dict[Hashable, int] = {}
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    async def run(self, key: Hashable, coro_fn: Callable[[], Awaitable]) -> Any:
+        """
+        Zaradí úlohu do fronty kľúča a počká na jej výsledok.
+
+        Args:
+            key: Kľúč férovosti (typicky chat ID)
+            coro_fn: Funkcia bez argumentov, ktorá vráti korutinu s prácou
+
+        Returns:
+            Výsledok korutiny (výnimky sa šíria k volajúcemu, zrušenie zruší aj úlohu)
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append((coro_fn, future, time.monotonic()))
+        self._submitted += 1
+        self._mark_ready(key)
+        self._dispatch()
+        return await future
+
+    def _mark_ready(self, key: Hashable):
+        if key in self._queues and key not in self._in_ready and self._running.get(key, 0) < self.per_key_limit:
+            self._ready.append(key)
+            self._in_ready.add(key)
+
+    def _dispatch(self):
+        """Spúšťa úlohy, kým sú voľné sloty; každý kľúč dostane jednu úlohu a ide na koniec radu."""
+        while self._active < self.max_workers and self._ready:
+            key = self._ready.popleft()
+            self._in_ready.discard(key)
+            queue = self._queues[key]
+
+            # Úlohy, na ktoré volajúci prestal čakať, preskočíme
+            while queue and queue[0][1].cancelled():
+                queue.popleft()
+            if not queue:
+                del self._queues[key]
+                continue
+
+            coro_fn, future, queued_at = queue.popleft()
+            if not queue:
+                del self._queues[key]
+
+            wait = time.monotonic() - queued_at
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._running[key] = self._running.get(key, 0) + 1
+            self._active += 1
+
+            task = asyncio.ensure_future(self._execute(key, coro_fn, future))
+            future.add_done_callback(lambda done, task=task: task.cancel() if done.cancelled() else None)
+            self._mark_ready(key)
+
+    async def _execute(self, key: Hashable, coro_fn: Callable[[], Awaitable], future: asyncio.Future):
+        try:
+            result = await coro_fn()
+        except asyncio.CancelledError:
+            future.cancel()
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        else:
+            if not future.done():
+                future.set_result(result)
+        finally:
+            self._completed += 1
+            self._active -= 1
+            self._running[key] -= 1
+            if not self._running[key]:
+                del self._running[key]
+            self._mark_ready(key)
+            self._dispatch()
+
+    def depth(self, key: Hashable) -> int:
+        """Vráti počet čakajúcich úloh daného kľúča."""
+        return len(self._queues.get(key, ()))
+
+    def stats(self) -> Dict[str, Any]:
+        """Vráti hĺbky front a časy čakania."""
+        depths = [len(queue) for queue in self._queues.values()]
+        started = self._completed + self._active
+        return {
+            "workers": self.max_workers,
+            "per_key_limit": self.per_key_limit,
+            "active": self._active,
+            "queued": sum(depths),
+            "keys_waiting": len(depths),
+            "max_queue_depth": max(depths, default=0),
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "avg_wait_ms": round(self._total_wait / started * 1000, 1) if started else 0.0,
+            "max_wait_ms": round(self._max_wait * 1000, 1)
+        }
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Lokálny falošný Telegram Bot API na skúšku webhook režimu bota.
+Spustí fake API s nastaviteľnou latenciou, bota vo webhook režime nasmerovaného
+naň a pošle mu naraz N aktualizácií; vypíše, za aký čas dostali všetky odpoveď.
+
+Použitie:
+    python fake_telegram.py --updates 100 --latency 0.3
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import logging
+from collections import Counter
+
+from aiohttp import web
+
+FAKE_TOKEN = "123456:FAKE-TOKEN"
+
+logger = logging.getLogger(__name__)
+
+
+class FakeTelegram:
+    """Minimálna implementácia Bot API metód, ktoré bot používa."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = Counter()
+        self.replied = asyncio.Event()
+        self.expected_replies = 0
+        self._message_id = 0
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        if request.content_type == "application/json":
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+        self.calls[method] += 1
+
+        # Latencia skutočného Bot API - sériové spracovanie by ju násobilo počtom používateľov
+        await asyncio.sleep(self.latency)
+
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+        elif method in ("sendMessage", "sendDocument", "editMessageText"):
+            self._message_id += 1
+            result = {
+                "message_id": self._message_id,
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+                "text": params.get("text", "")
+            }
+            if self.expected_replies and self.calls["sendMessage"] >= self.expected_replies:
+                self.replied.set()
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(r"/bot{token}/{method}", self.handle)
+        return app
+
+
+def make_update(update_id: int, text: str) -> dict:
+    """Vytvorí aktualizáciu so správou od samostatného používateľa."""
+    user = {"id": 1000 + update_id, "is_bot": False, "first_name": f"User{update_id}"}
+    message = {
+        "message_id": update_id,
+        "date": int(time.time()),
+        "chat": {"id": user["id"], "type": "private"},
+        "from": user,
+        "text": text
+    }
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+
+async def run(updates: int, latency: float, text: str, api_port: int, webhook_port: int) -> int:
+    fake = FakeTelegram(latency)
+    fake.expected_replies = updates
+    api_runner = web.AppRunner(fake.create_app())
+    await api_runner.setup()
+    await web.TCPSite(api_runner, "127.0.0.1", api_port).start()
+
+    # Bot sa importuje až po nastavení prostredia, konštanty číta pri importe
+    os.environ["TELEGRAM_BOT_TOKEN"] = FAKE_TOKEN
+    os.environ["TELEGRAM_API_BASE_URL"] = f"http://127.0.0.1:{api_port}"
+    os.environ["BOT_WEBHOOK_URL"] = f"http://127.0.0.1:{webhook_port}"
+    import bot_webhook
+    from youtube_transcript_bot import build_application
+
+    application = build_application(webhook=True)
+    bot_runner = web.AppRunner(bot_webhook.create_web_app(application))
+    await bot_runner.setup()
+    await web.TCPSite(bot_runner, "127.0.0.1", webhook_port).start()
+
+    import aiohttp
+    url = f"http://127.0.0.1:{webhook_port}{bot_webhook.BOT_WEBHOOK_PATH}"
+    headers = {bot_webhook.SECRET_HEADER: bot_webhook.BOT_WEBHOOK_SECRET} if bot_webhook.BOT_WEBHOOK_SECRET else {}
+
+    started = time.monotonic()
+    async with aiohttp.ClientSession() as session:
+        async def post(update_id: int):
+            async with session.post(url, json=make_update(update_id, text), headers=headers) as response:
+                return response.status
+
+        statuses = await asyncio.gather(*(post(i) for i in range(1, updates + 1)))
+
+    try:
+        await asyncio.wait_for(fake.replied.wait(), timeout=max(30.0, updates * latency * 2))
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.monotonic() - started
+
+    await bot_runner.cleanup()
+    await api_runner.cleanup()
+
+    replies = fake.calls["sendMessage"]
+    print(f"Aktualizácie: {updates} (HTTP {dict(Counter(statuses))})")
+    print(f"Odpovede:     {replies}")
+    print(f"Čas:          {elapsed:.2f} s (sériovo by to bolo aspoň {updates * latency:.2f} s)")
+    print(f"Volania API:  {dict(fake.calls)}")
+    return 0 if replies >= updates else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Záťažová skúška webhook režimu bota proti falošnému Bot API")
+    parser.add_argument("--updates", type=int, default=50, help="Počet súbežných aktualizácií")
+    parser.add_argument("--latency", type=float, default=0.3, help="Latencia falošného API v sekundách")
+    parser.add_argument("--text", default="/start", help="Text správ (napr. /start alebo YouTube odkaz)")
+    parser.add_argument("--api-port", type=int, default=8081)
+    parser.add_argument("--webhook-port", type=int, default=8082)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(asyncio.run(run(args.updates, args.latency, args.text, args.api_port, args.webhook_port)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Hromadné získanie transkriptov pre zoznam videí na offline analýzy.
+Číta odkazy alebo video ID zo súborov alebo stdin, sťahuje ich po dávkach
+s viacerými ID súbežne a výsledky priebežne zapisuje do JSONL alebo Parquet.
+Kontrolný bod (súbor s ID už zapísaných videí) umožní prerušený beh dokončiť
+bez opätovného sťahovania - stačí ho spustiť znova s rovnakými parametrami.
+Videá bez transkriptu sa zapíšu raz s chybou a ďalší beh ich preskočí; videá, pri ktorých
+zlyhala požiadavka (sieť, 5xx, 429 po všetkých pokusoch), sa nezapíšu a ďalší beh ich skúsi znova.
+
+Použitie:
+    python harvest_transcripts.py videos.txt -o transcripts.jsonl
+    cat ids.txt | python harvest_transcripts.py - -o transcripts --format parquet --concurrency 8
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import aiohttp
+
+import http_client
+from transcript_utils import (
+    extract_video_ids, fetch_transcripts, Transcript, TranscriptApiError, TRANSCRIPT_BATCH_MAX_SIZE
+)
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+# Samostatné video ID (riadok so zoznamom ID namiesto odkazov)
+_BARE_ID_RE = re.compile(r'^[\w-]{11}$')
+
+# Začiatok riadku JSONL výstupu (video_id je v zázname vždy prvý)
+_JSONL_ID_RE = re.compile(r'^\{"video_id": "([\w-]{11})"')
+
+# Chyby, pri ktorých nemá zmysel pokračovať (neplatný token)
+FATAL_STATUSES = (401, 403)
+
+
+def read_video_ids(sources: Iterable[str]) -> List[str]:
+    """
+    Načíta video ID zo súborov ("-" je stdin); riadok môže obsahovať odkazy alebo holé ID.
+
+    Returns:
+        Video ID v poradí prvého výskytu, bez duplicít
+    """
+    video_ids = {}
+    for source in sources:
+        handle = sys.stdin if source == "-" else open(source, encoding="utf-8")
+        try:
+            for line in handle:
+                # Odkazy aj holé ID môžu byť na jednom riadku, poradie zostáva podľa výskytu
+                for token in line.split():
+                    found = extract_video_ids(token) or ([token] if _BARE_ID_RE.match(token) else [])
+                    video_ids.update(dict.fromkeys(found))
+        finally:
+            if handle is not sys.stdin:
+                handle.close()
+    return list(video_ids)
+
+
+class Checkpoint:
+    """Súbor s ID videí, ktorých výsledok je už zapísaný vo výstupe (jedno ID na riadok)."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done = set()
+        self._handle = None
+        if path:
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as handle:
+                    self.done.update(line.strip() for line in handle if line.strip())
+            self._handle = open(path, "a", encoding="utf-8")
+
+    def mark(self, video_ids: List[str]):
+        if self._handle is not None and video_ids:
+            self._handle.write("".join(f"{video_id}\n" for video_id in video_ids))
+            self._handle.flush()
+        self.done.update(video_ids)
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+
+
+class JsonlOutput:
+    """Jeden riadok JSON na video: {"video_id", "segments"[, "text"]} alebo {"video_id", "error"} pre video bez transkriptu."""
+
+    def __init__(self, path: str, include_text: bool = False):
+        self.path = path
+        self.include_text = include_text
+        if path == "-":
+            self._handle = sys.stdout
+        else:
+            # Po prerušení môže súbor končiť neúplným riadkom - nový začneme na ďalšom
+            needs_newline = False
+            if os.path.exists(path) and os.path.getsize(path):
+                with open(path, "rb") as handle:
+                    handle.seek(-1, os.SEEK_END)
+                    needs_newline = handle.read(1) != b"\n"
+            self._handle = open(path, "a", encoding="utf-8")
+            if needs_newline:
+                self._handle.write("\n")
+        self._pending: List[str] = []
+
+    def existing_ids(self) -> Set[str]:
+        """Vráti ID videí, ktorých celý riadok už je vo výstupe (aj keď ich kontrolný bod nestihol zapísať)."""
+        video_ids = set()
+        if self.path == "-" or not os.path.exists(self.path):
+            return video_ids
+        with open(self.path, encoding="utf-8") as handle:
+            for line in handle:
+                match = _JSONL_ID_RE.match(line)
+                # Neúplný posledný riadok po prerušení sa nepočíta
+                if match and line.endswith("\n"):
+                    video_ids.add(match.group(1))
+        return video_ids
+
+    def add(self, video_id: str, transcript: Transcript):
+        record = {"video_id": video_id, "segments": transcript.segments()}
+        if self.include_text:
+            record["text"] = transcript.text
+        self._handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._pending.append(video_id)
+
+    def add_error(self, video_id: str, error: str):
+        self._handle.write(json.dumps({"video_id": video_id, "error": error}, ensure_ascii=False) + "\n")
+        self._pending.append(video_id)
+
+    def flush(self, force: bool = False) -> List[str]:
+        """Zapíše rozpracované riadky a vráti ID videí, ktoré sú odteraz vo výstupe."""
+        self._handle.flush()
+        video_ids, self._pending = self._pending, []
+        return video_ids
+
+    def close(self):
+        self.flush()
+        if self._handle is not sys.stdout:
+            self._handle.close()
+
+
+class ParquetOutput:
+    """
+    Stĺpcový výstup: adresár súborov part-NNNNN.parquet s riadkom na segment
+    (video_id, start, duration, text). Súbor sa zapíše naraz, keď sa nazbiera
+    rows_per_file segmentov, takže prerušenie nenechá poškodený súbor.
+    """
+
+    def __init__(self, directory: str, rows_per_file: int = 200_000):
+        if pyarrow is None:
+            raise RuntimeError("Výstup Parquet vyžaduje balík pyarrow (pip install pyarrow)")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.rows_per_file = rows_per_file
+        parts = [name for name in os.listdir(directory) if re.match(r'^part-\d+\.parquet$', name)]
+        self._next_part = max((int(name[5:-8]) for name in parts), default=-1) + 1
+        self._columns: Dict[str, list] = {"video_id": [], "start": [], "duration": [], "text": []}
+        self._pending: List[str] = []
+
+    def existing_ids(self) -> Set[str]:
+        """Vráti ID videí v už zapísaných súboroch part-NNNNN.parquet."""
+        video_ids = set()
+        for name in os.listdir(self.directory):
+            if re.match(r'^part-\d+\.parquet$', name):
+                table = pq.read_table(os.path.join(self.directory, name), columns=["video_id"])
+                video_ids.update(table.column("video_id").unique().cast(pyarrow.string()).to_pylist())
+        return video_ids
+
+    def add(self, video_id: str, transcript: Transcript):
+        count = len(transcript)
+        self._columns["video_id"].extend([video_id] * count)
+        self._columns["start"].extend(transcript.starts)
+        self._columns["duration"].extend(transcript.durations)
+        self._columns["text"].extend(transcript.segment_text(i) for i in range(count))
+        self._pending.append(video_id)
+
+    def add_error(self, video_id: str, error: str):
+        # Chyby sa do stĺpcového výstupu nezapisujú (sú v logu), video sa však považuje za spracované
+        self._pending.append(video_id)
+
+    def flush(self, force: bool = False) -> List[str]:
+        """Ak je nazbieraných dosť segmentov (alebo force), zapíše ďalší súbor a vráti jeho video ID."""
+        if not self._pending or (not force and len(self._columns["video_id"]) < self.rows_per_file):
+            return []
+
+        table = pyarrow.table({
+            "video_id": pyarrow.array(self._columns["video_id"], pyarrow.string()).dictionary_encode(),
+            "start": pyarrow.array(self._columns["start"], pyarrow.float64()),
+            "duration": pyarrow.array(self._columns["duration"], pyarrow.float64()),
+            "text": pyarrow.array(self._columns["text"], pyarrow.string())
+        })
+        path = os.path.join(self.directory, f"part-{self._next_part:05d}.parquet")
+        pq.write_table(table, path + ".tmp", compression="zstd")
+        os.replace(path + ".tmp", path)
+        self._next_part += 1
+
+        for column in self._columns.values():
+            column.clear()
+        video_ids, self._pending = self._pending, []
+        return video_ids
+
+    def close(self):
+        self.flush(force=True)
+
+
+class Pacer:
+    """Rozostupy medzi požiadavkami na API a spoločná pauza všetkých workerov po 429."""
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._paused_until = 0.0
+
+    async def wait(self):
+        now = time.monotonic()
+        slot = max(now, self._next, self._paused_until)
+        self._next = slot + self._interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class Harvester:
+    """Sťahuje dávky video ID súbežne a zapisuje výsledky do výstupu a kontrolného bodu."""
+
+    def __init__(self, output, checkpoint: Checkpoint, concurrency: int, batch_size: int,
+                 rate: float, retries: int, use_cache: bool):
+        self.output = output
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.retries = retries
+        self.use_cache = use_cache
+        self.pacer = Pacer(rate)
+        self.counts = {"done": 0, "missing": 0, "failed": 0, "batches": 0, "rate_limited": 0, "retries": 0}
+        self._total = 0
+        self._started = 0.0
+        self._last_report = 0.0
+
+    async def run(self, video_ids: List[str]) -> Dict[str, int]:
+        """Spracuje všetky video ID a vráti počítadlá."""
+        self._total = len(video_ids)
+        self._started = self._last_report = time.monotonic()
+        batches = iter([video_ids[i:i + self.batch_size] for i in range(0, len(video_ids), self.batch_size)])
+        try:
+            # Workeri si berú ďalšiu dávku zo spoločného iterátora
+            await asyncio.gather(*(self._work(batches) for _ in range(self.concurrency)))
+        finally:
+            self.checkpoint.mark(self.output.flush(force=True))
+            await http_client.close_async_session()
+        return dict(self.counts)
+
+    async def _work(self, batches):
+        for batch in batches:
+            await self._process(batch)
+            # Do kontrolného bodu ide len to, čo už výstup naozaj zapísal
+            self.checkpoint.mark(self.output.flush())
+            self._report()
+
+    async def _process(self, batch: List[str]):
+        """Stiahne dávku a zapíše výsledky; dávku odmietnutú API (4xx) delí, kým nenájde zlé ID."""
+        try:
+            results = await self._fetch(batch)
+        except TranscriptApiError as e:
+            if e.status in FATAL_STATUSES:
+                raise
+            if len(batch) > 1:
+                middle = len(batch) // 2
+                await self._process(batch[:middle])
+                await self._process(batch[middle:])
+                return
+            logger.error(f"API odmietlo video {batch[0]}: {e}")
+            self.output.add_error(batch[0], f"API odmietlo požiadavku ({e.status})")
+            self.counts["missing"] += 1
+            return
+
+        if results is None:
+            # Prechodná chyba - nič nezapíšeme, ďalší beh dávku skúsi znova
+            self.counts["failed"] += len(batch)
+            return
+
+        for video_id in batch:
+            transcript_data = results.get(video_id)
+            transcript = Transcript.from_response(transcript_data, video_id) if transcript_data else None
+            if transcript is not None and len(transcript):
+                self.output.add(video_id, transcript)
+                self.counts["done"] += 1
+            else:
+                self.output.add_error(video_id, "Transkript nie je k dispozícii")
+                self.counts["missing"] += 1
+
+    async def _fetch(self, batch: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Stiahne dávku; sieťové chyby, 5xx a 429 opakuje s narastajúcou pauzou.
+
+        Returns:
+            Výsledky dávky alebo None, ak všetky pokusy zlyhali (ostatné 4xx sa vyhodia)
+        """
+        for attempt in range(self.retries + 1):
+            await self.pacer.wait()
+            self.counts["batches"] += 1
+            try:
+                return await fetch_transcripts(batch, use_cache=self.use_cache)
+            except TranscriptApiError as e:
+                if e.status == 429:
+                    self.counts["rate_limited"] += 1
+                    delay = e.retry_after or min(60.0, 2.0 ** attempt)
+                    self.pacer.pause(delay)
+                elif e.status < 500:
+                    raise
+                else:
+                    delay = min(60.0, 2.0 ** attempt)
+                logger.warning(f"Dávka {batch[0]}.. zlyhala ({e.status}), ďalší pokus o {delay:.1f} s")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                delay = min(60.0, 2.0 ** attempt)
+                logger.warning(f"Dávka {batch[0]}.. zlyhala ({e!r}), ďalší pokus o {delay:.1f} s")
+            if attempt < self.retries:
+                self.counts["retries"] += 1
+                await asyncio.sleep(delay)
+        logger.error(f"Dávka {batch[0]}.. zlyhala aj po {self.retries + 1} pokusoch, ďalší beh ju skúsi znova")
+        return None
+
+    def _report(self, every: float = 5.0):
+        now = time.monotonic()
+        if now - self._last_report < every:
+            return
+        self._last_report = now
+        processed = self.counts["done"] + self.counts["missing"] + self.counts["failed"]
+        rate = processed / max(now - self._started, 1e-9)
+        logger.info(f"Spracované {processed}/{self._total} ({rate:.1f} videí/s, bez transkriptu: {self.counts['missing']}, "
+                    f"zlyhané: {self.counts['failed']}, 429: {self.counts['rate_limited']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Hromadné získanie transkriptov YouTube videí do JSONL alebo Parquet",
+        epilog="Výstup aj kontrolný bod sa dopĺňajú; nový beh od začiatku = zmazať oba."
+    )
+    parser.add_argument("inputs", nargs="*", default=["-"], help="Súbory s odkazmi alebo video ID (\"-\" = stdin)")
+    parser.add_argument("-o", "--output", default="-", help="Výstupný JSONL súbor (\"-\" = stdout) alebo adresár pre Parquet")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--text", action="store_true", help="Do JSONL pridať aj celý text transkriptu")
+    parser.add_argument("--checkpoint", help="Súbor kontrolného bodu (predvolene <output>.checkpoint)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Počet súbežných požiadaviek na API")
+    parser.add_argument("--batch-size", type=int, default=TRANSCRIPT_BATCH_MAX_SIZE, help="Počet video ID v jednej požiadavke")
+    parser.add_argument("--rate", type=float, default=0, help="Najviac požiadaviek za sekundu (0 = bez limitu, riadi sa 429)")
+    parser.add_argument("--retries", type=int, default=5, help="Počet opakovaní dávky pri chybe")
+    parser.add_argument("--no-cache", action="store_true", help="Nečítať ani neukladať lokálnu cache transkriptov")
+    args = parser.parse_args()
+
+    # Priebeh tohto nástroja áno, ale nie INFO z cache pri každom z tisícov videí
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    logger.setLevel(logging.INFO)
+
+    if args.format == "parquet" and args.output == "-":
+        parser.error("Pre --format parquet je potrebné zadať výstupný adresár (-o)")
+    checkpoint_path = args.checkpoint or (f"{args.output.rstrip('/')}.checkpoint" if args.output != "-" else None)
+
+    try:
+        output = ParquetOutput(args.output) if args.format == "parquet" else JsonlOutput(args.output, args.text)
+    except RuntimeError as e:
+        parser.error(str(e))
+
+    checkpoint = Checkpoint(checkpoint_path)
+    # Výstup sa zapisuje pred kontrolným bodom - videá zapísané tesne pred prerušením doplníme z výstupu
+    recovered = output.existing_ids() - checkpoint.done
+    if recovered:
+        logger.info(f"Do kontrolného bodu doplnených {len(recovered)} videí, ktoré už sú vo výstupe")
+        checkpoint.mark(sorted(recovered))
+    video_ids = [video_id for video_id in read_video_ids(args.inputs) if video_id not in checkpoint.done]
+    logger.info(f"Na spracovanie: {len(video_ids)} videí (preskočených z kontrolného bodu: {len(checkpoint.done)})")
+
+    harvester = Harvester(output, checkpoint, args.concurrency, args.batch_size,
+                          args.rate, args.retries, not args.no_cache)
+    started = time.monotonic()
+    try:
+        counts = asyncio.run(harvester.run(video_ids))
+    except TranscriptApiError as e:
+        logger.error(f"API odmietlo prístup, beh končí (skontroluj YOUTUBE_TRANSCRIPT_API_TOKEN): {e}")
+        sys.exit(2)
+    except KeyboardInterrupt:
+        logger.warning("Prerušené - spusti znova s rovnakými parametrami na pokračovanie")
+        sys.exit(130)
+    finally:
+        # Aj po prerušení zapíšeme rozpracovaný výstup, aby ho ďalší beh nesťahoval znova
+        checkpoint.mark(output.flush(force=True))
+        output.close()
+        checkpoint.close()
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Hotovo: {counts['done']} transkriptov, {counts['missing']} bez transkriptu, "
+                f"{counts['failed']} zlyhaných (skúsi ďalší beh), {counts['batches']} pokusov o dávku "
+                f"({counts['rate_limited']}× 429) za {elapsed:.1f} s")
+    sys.exit(1 if counts["failed"] else 0)
+
+
+if __name__ == '__main__':
+    main()
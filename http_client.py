@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Zdieľaní HTTP klienti pre všetky externé služby (youtube-transcript.io, Telegram).
+Spojenia sa držia v pooloch podľa hostiteľa s keep-alive, takže opakované volania
+neplatia znova DNS, TCP a TLS. Synchrónna session je jedna na proces,
+asynchrónna jedna na event loop.
+"""
+
+import os
+import atexit
+import asyncio
+import logging
+import weakref
+import threading
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Nastavenia timeoutov a veľkosti poolov
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 5))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 60))
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 20))
+HTTP_KEEPALIVE = float(os.environ.get('HTTP_KEEPALIVE', 60))
+
+# Timeout pre requests vo formáte (connect, read)
+TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+_sync_session = None
+_sync_session_pid = None
+_sync_lock = threading.Lock()
+
+_async_sessions = weakref.WeakKeyDictionary()
+
+
+def get_session() -> requests.Session:
+    """Vráti zdieľanú synchrónnu session (po fork-e workera sa vytvorí nová)."""
+    global _sync_session, _sync_session_pid
+
+    if _sync_session is not None and _sync_session_pid == os.getpid():
+        return _sync_session
+
+    with _sync_lock:
+        if _sync_session is None or _sync_session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sync_session = session
+            _sync_session_pid = os.getpid()
+    return _sync_session
+
+
+def close_session():
+    """Zatvorí synchrónnu session a jej spojenia."""
+    global _sync_session
+    with _sync_lock:
+        if _sync_session is not None:
+            _sync_session.close()
+            _sync_session = None
+
+
+def get_async_session() -> aiohttp.ClientSession:
+    """Vráti zdieľanú aiohttp session pre aktuálny event loop."""
+    loop = asyncio.get_running_loop()
+    session = _async_sessions.get(loop)
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_SIZE * 5,
+            limit_per_host=HTTP_POOL_SIZE,
+            ttl_dns_cache=300,
+            keepalive_timeout=HTTP_KEEPALIVE
+        )
+        timeout = aiohttp.ClientTimeout(sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT)
+        session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        _async_sessions[loop] = session
+    return session
+
+
+async def close_async_session():
+    """Zatvorí aiohttp session aktuálneho event loopu (napr. pri vypnutí bota)."""
+    session = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+async def closing(coro):
+    """
+    Spustí korutinu a potom zatvorí session jej event loopu.
+    Používa sa s asyncio.run(), kde slučka po skončení zanikne.
+    """
+    try:
+        return await coro
+    finally:
+        await close_async_session()
+
+
+atexit.register(close_session)
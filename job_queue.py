@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Lokálna fronta úloh na pozadí pre pomalé operácie (sumarizácia, TTS, Telegram).
+Úlohy sa ukladajú do SQLite, takže ich vidia všetky procesy na stroji a prežijú
+timeout požiadavky; vykonáva ich obmedzený počet vlákien podľa priority.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from cache_store import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+JOB_RESULT_TTL = int(os.environ.get('JOB_RESULT_TTL', 24 * 3600))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 2))
+# Ako často sa pozrieť do databázy, ak nás o novej úlohe neupozornil vlastný proces
+JOB_POLL_INTERVAL = 1.0
+# Koľkokrát skúsiť zapísať výsledný stav úlohy, ak je databáza zamknutá
+JOB_STATUS_RETRIES = 5
+
+# Stavy úlohy
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Nižšie číslo = vyššia priorita
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+# Handler dostane payload a funkciu na hlásenie priebehu, vráti dict (JSON) alebo bytes (audio)
+Handler = Callable[[Dict[str, Any], Callable[[float, str], None]], Any]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _process_token(pid: int) -> Optional[str]:
+    """
+    Vráti identifikátor procesu, ktorý sa nezopakuje ani po reštarte kontajnera,
+    keď nový proces dostane rovnaké pid (pid a čas štartu procesu z /proc).
+
+    Returns:
+        Identifikátor "pid:štart" (bez /proc len "pid"), None ak proces nebeží
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+    except FileNotFoundError:
+        if os.path.isdir("/proc/self"):
+            return None
+        # Systém bez /proc - ostáva len kontrola, či pid žije
+        return str(pid) if _pid_alive(pid) else None
+    except OSError:
+        return None
+    # Názov procesu v zátvorkách môže obsahovať medzery, čas štartu je 22. pole
+    fields = stat[stat.rfind(')') + 2:].split()
+    return f"{pid}:{fields[19]}"
+
+
+def _owner_alive(owner: Any) -> bool:
+    """Zistí, či proces zapísaný ako vlastník úlohy stále beží."""
+    if owner is None:
+        return False
+    owner = str(owner)
+    try:
+        pid = int(owner.split(':')[0])
+    except ValueError:
+        return False
+    return _process_token(pid) == owner
+
+
+class JobQueue:
+    """Fronta úloh v SQLite s poolom pracovných vlákien."""
+
+    def __init__(self, path: Optional[str] = None, workers: int = JOB_WORKERS):
+        """
+        Args:
+            path: Voliteľná cesta k súboru, inak CACHE_DIR/jobs.sqlite3
+            workers: Počet pracovných vlákien v každom procese
+        """
+        self.path = path or os.path.join(CACHE_DIR, "jobs.sqlite3")
+        self.workers = workers
+        self._handlers: Dict[str, Handler] = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._started_pid = None
+        self._owner: Optional[str] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Vráti spojenie pre aktuálne vlákno (a proces - po fork-e sa otvorí nové)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, priority INTEGER NOT NULL, "
+            "status TEXT NOT NULL, payload TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "progress REAL NOT NULL DEFAULT 0, message TEXT, error TEXT, "
+            "result BLOB, result_type TEXT, owner INTEGER, "
+            "created REAL NOT NULL, started REAL, finished REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority, created)")
+
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def register(self, kind: str, handler: Handler):
+        """Zaregistruje funkciu, ktorá vykoná úlohy daného typu."""
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, payload: Dict[str, Any], priority: int = PRIORITY_NORMAL) -> str:
+        """
+        Zaradí úlohu do fronty.
+
+        Args:
+            kind: Typ úlohy (musí mať zaregistrovaný handler)
+            payload: Vstupné dáta úlohy (musia sa dať uložiť ako JSON)
+            priority: Priorita, nižšie číslo sa vykoná skôr
+
+        Returns:
+            ID úlohy
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Neznámy typ úlohy: {kind}")
+
+        self.start()
+        job_id = uuid.uuid4().hex
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, priority, status, payload, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_id, kind, priority, QUEUED, json.dumps(payload, ensure_ascii=False), time.time())
+        )
+        with self._wakeup:
+            self._wakeup.notify()
+        logger.info(f"Úloha {job_id} ({kind}) zaradená do fronty s prioritou {priority}")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Vráti stav úlohy; JSON výsledok je priamo v poli "result", binárny len ako has_result."""
+        self.start()
+        row = self._connect().execute(
+            "SELECT id, kind, priority, status, attempts, progress, message, error, "
+            "result_type, result IS NOT NULL, created, started, finished FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        keys = ("id", "kind", "priority", "status", "attempts", "progress", "message", "error",
+                "result_type", "has_result", "created", "started", "finished")
+        job = dict(zip(keys, row))
+        job["has_result"] = bool(job["has_result"])
+        if job["status"] == QUEUED:
+            job["position"] = self._position(job_id)
+        if job["result_type"] == 'application/json':
+            job["result"] = json.loads(self.result(job_id)[0])
+        return job
+
+    def _position(self, job_id: str) -> int:
+        """Vráti počet úloh vo fronte pred danou úlohou."""
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM jobs j, jobs me WHERE me.id = ? AND j.status = ? "
+            "AND (j.priority < me.priority OR (j.priority = me.priority AND j.created < me.created))",
+            (job_id, QUEUED)
+        ).fetchone()[0]
+
+    def result(self, job_id: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """Vráti dvojicu (výsledok, MIME typ) dokončenej úlohy alebo (None, None)."""
+        row = self._connect().execute(
+            "SELECT result, result_type FROM jobs WHERE id = ? AND status = ?", (job_id, DONE)
+        ).fetchone()
+        if row is None or row[0] is None:
+            return None, None
+        return bytes(row[0]), row[1]
+
+    def stats(self) -> Dict[str, Any]:
+        """Vráti počet úloh podľa stavu a počet pracovných vlákien."""
+        try:
+            counts = dict(self._connect().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        except sqlite3.Error as e:
+            logger.warning(f"Chyba pri čítaní štatistík fronty úloh: {e}")
+            counts = {}
+        return {
+            "workers": self.workers,
+            **{status: counts.get(status, 0) for status in (QUEUED, RUNNING, DONE, FAILED)}
+        }
+
+    def start(self):
+        """
+        Vráti do fronty prerušené úlohy a spustí pracovné vlákna, ak v tomto procese
+        (aj po fork-e) ešte nebežia. Volá sa pri štarte aplikácie a pri každom prístupe k fronte.
+        """
+        if self._started_pid == os.getpid():
+            return
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            self._owner = _process_token(os.getpid()) or str(os.getpid())
+            self._recover()
+            for i in range(self.workers):
+                threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True).start()
+            self._started_pid = os.getpid()
+            logger.info(f"Spustených {self.workers} pracovných vlákien fronty úloh")
+
+    def _recover(self):
+        """Vráti do fronty úlohy, ktoré rozbehol proces, ktorý už nebeží."""
+        conn = self._connect()
+        orphans = [
+            (job_id,) for job_id, owner in conn.execute("SELECT id, owner FROM jobs WHERE status = ?", (RUNNING,))
+            if not _owner_alive(owner)
+        ]
+        conn.executemany("UPDATE jobs SET status = ?, owner = NULL WHERE id = ? AND status = ?",
+                         [(QUEUED, job_id, RUNNING) for (job_id,) in orphans])
+        if orphans:
+            logger.info(f"Do fronty vrátených {len(orphans)} prerušených úloh")
+
+    def _claim(self) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """Atomicky prevezme najprioritnejšiu čakajúcu úlohu."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts FROM jobs WHERE status = ? ORDER BY priority, created LIMIT 1",
+                (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            job_id, kind, payload, attempts = row
+            if attempts >= JOB_MAX_ATTEMPTS:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+                    (FAILED, "Úloha bola opakovane prerušená", time.time(), job_id)
+                )
+                conn.execute("COMMIT")
+                return self._claim()
+
+            conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, attempts = attempts + 1, started = ? WHERE id = ?",
+                (RUNNING, self._owner, time.time(), job_id)
+            )
+            conn.execute("COMMIT")
+            return job_id, kind, json.loads(payload)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _work(self):
+        while True:
+            try:
+                job = self._claim()
+            except sqlite3.Error as e:
+                logger.warning(f"Chyba pri preberaní úlohy z fronty: {e}")
+                job = None
+
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(JOB_POLL_INTERVAL)
+                continue
+
+            try:
+                self._run(*job)
+                self._cleanup()
+            except Exception as e:
+                # Vlákno nesmie skončiť, inak pool natrvalo príde o pracovníka
+                logger.error(f"Neočakávaná chyba pracovného vlákna fronty úloh: {e}", exc_info=True)
+
+    def _set_status(self, job_id: str, sql: str, params: Tuple):
+        """Zapíše výsledný stav úlohy; pri zamknutej databáze to skúsi znova."""
+        for attempt in range(JOB_STATUS_RETRIES):
+            try:
+                self._connect().execute(sql, params)
+                return
+            except sqlite3.Error as e:
+                if attempt == JOB_STATUS_RETRIES - 1:
+                    raise
+                logger.warning(f"Chyba pri zápise stavu úlohy {job_id}, skúšam znova: {e}")
+                time.sleep(2 ** attempt)
+
+    def _run(self, job_id: str, kind: str, payload: Dict[str, Any]):
+        conn = self._connect()
+
+        def progress(fraction: float, message: str = ""):
+            conn.execute("UPDATE jobs SET progress = ?, message = ? WHERE id = ?", (fraction, message, job_id))
+
+        try:
+            result = self._handlers[kind](payload, progress)
+            if isinstance(result, (bytes, bytearray)):
+                value, result_type = bytes(result), 'audio/mpeg'
+            else:
+                value, result_type = json.dumps(result, ensure_ascii=False).encode('utf-8'), 'application/json'
+        except Exception as e:
+            logger.error(f"Úloha {job_id} ({kind}) zlyhala: {e}", exc_info=True)
+            self._set_status(
+                job_id, "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+                (FAILED, str(e), time.time(), job_id)
+            )
+            return
+
+        self._set_status(
+            job_id, "UPDATE jobs SET status = ?, progress = 1, result = ?, result_type = ?, finished = ? WHERE id = ?",
+            (DONE, value, result_type, time.time(), job_id)
+        )
+        logger.info(f"Úloha {job_id} ({kind}) dokončená")
+
+    def _cleanup(self):
+        """Zmaže dokončené úlohy staršie ako JOB_RESULT_TTL."""
+        try:
+            self._connect().execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished < ?",
+                (DONE, FAILED, time.time() - JOB_RESULT_TTL)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Chyba pri mazaní starých úloh: {e}")
+
+
+# Zdieľaná fronta pre celý proces
+jobs = JobQueue()
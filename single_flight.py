@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Zlúčenie rovnakých súbežných volaní na externé služby (single-flight).
+Keď rovnakú operáciu s rovnakým vstupom spustí naraz viac požiadaviek,
+skutočné volanie vykoná len prvá a ostatné počkajú na jej výsledok.
+"""
+
+import json
+import asyncio
+import hashlib
+import logging
+import functools
+import threading
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+def make_key(*parts: Any) -> str:
+    """Vytvorí hash kľúč z obsahu argumentov."""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _AsyncCall:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Register prebiehajúcich volaní podľa operácie a kľúča."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[str, _AsyncCall] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, operation: str, collapsed: bool):
+        counters = self._stats.setdefault(operation, {"calls": 0, "collapsed": 0})
+        counters["calls"] += 1
+        if collapsed:
+            counters["collapsed"] += 1
+
+    def do(self, operation: str, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Vykoná fn(), ak rovnaké volanie práve neprebieha, inak počká na jeho výsledok.
+
+        Args:
+            operation: Názov operácie (napr. "summarize")
+            key: Kľúč vstupu, typicky make_key(...)
+            fn: Funkcia bez argumentov, ktorá vykoná skutočné volanie
+
+        Returns:
+            Výsledok fn() (zdieľaný medzi všetkými čakajúcimi)
+        """
+        full_key = f"{operation}:{key}"
+        with self._lock:
+            call = self._calls.get(full_key)
+            leader = call is None
+            if leader:
+                call = self._calls[full_key] = _Call()
+            self._count(operation, collapsed=not leader)
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[full_key]
+            call.event.set()
+
+    async def do_async(self, operation: str, key: str, coro_fn: Callable[[], Awaitable]) -> Any:
+        """
+        Asynchrónna verzia do() pre volania v rámci jedného event loopu.
+        Volanie beží ako samostatná úloha; zrušenie jedného čakajúceho (aj prvého)
+        ju nezruší, zruší sa až vtedy, keď na ňu už nikto nečaká.
+        """
+        full_key = f"{operation}:{key}"
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            call = self._async_calls.get(full_key)
+            leader = call is None or call.task.get_loop() is not loop
+            if leader:
+                call = self._async_calls[full_key] = _AsyncCall(loop.create_task(coro_fn()))
+                call.task.add_done_callback(functools.partial(self._finish_async, full_key, call))
+            self._count(operation, collapsed=not leader)
+            call.waiters += 1
+
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                call.task.cancel()
+
+    def _finish_async(self, full_key: str, call: _AsyncCall, task: asyncio.Task):
+        with self._lock:
+            if self._async_calls.get(full_key) is call:
+                del self._async_calls[full_key]
+        if not task.cancelled():
+            task.exception()  # Označíme výnimku ako spracovanú, aj keď už nikto nečaká
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Vráti počet volaní a zlúčených volaní pre každú operáciu."""
+        with self._lock:
+            return {operation: dict(counters) for operation, counters in self._stats.items()}
+
+
+# Zdieľaný register pre celý proces
+flight = SingleFlight()
+
+
+def single_flight(operation: str):
+    """
+    Dekorátor pre metódy, ktoré zlúči súbežné volania s rovnakými argumentmi.
+    Kľúč sa počíta z obsahu argumentov (bez self).
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = make_key(args, kwargs)
+            return flight.do(operation, key, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def single_flight_async(operation: str):
+    """Verzia dekorátora single_flight pre asynchrónne metódy."""
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            key = make_key(args, kwargs)
+            return await flight.do_async(operation, key, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorator
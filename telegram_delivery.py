@@ -0,0 +1,261 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Doručovanie podcastov a dopyty na Telegram Bot API z webovej aplikácie.
+Audio sa nahráva priamo z pamäte, file_id vrátené Telegramom sa pamätá, takže
+rovnaký podcast do ďalších chatov už nenahrávame znova. Odosielanie ide cez
+asynchrónnu frontu, ktorá dodržiava limity Telegramu a reaguje na retry_after.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import weakref
+import threading
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+import http_client
+import background_loop
+from cache_store import SqliteCache
+
+logger = logging.getLogger(__name__)
+
+# Token bota - najprv z prostredia, potom z config.py (do kódu ho nedávame)
+TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
+if not TELEGRAM_BOT_TOKEN:
+    try:
+        from config import TELEGRAM_BOT_TOKEN
+    except ImportError:
+        TELEGRAM_BOT_TOKEN = None
+if not TELEGRAM_BOT_TOKEN:
+    logger.warning("TELEGRAM_BOT_TOKEN nie je nastavený. Odosielanie do Telegramu nebude fungovať.")
+TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+
+# Limity Telegramu: ~30 správ za sekundu spolu, 1 za sekundu do chatu, 20 za minútu do skupiny
+TELEGRAM_GLOBAL_RATE = float(os.environ.get('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_INTERVAL = 1.0
+TELEGRAM_GROUP_INTERVAL = 3.0
+TELEGRAM_SEND_WORKERS = int(os.environ.get('TELEGRAM_SEND_WORKERS', 4))
+TELEGRAM_MAX_RETRIES = int(os.environ.get('TELEGRAM_MAX_RETRIES', 3))
+TELEGRAM_CHAT_CACHE_TTL = int(os.environ.get('TELEGRAM_CHAT_CACHE_TTL', 24 * 3600))
+
+# file_id je platné natrvalo pre daného bota, preto dlhé TTL
+file_id_cache = SqliteCache('telegram_files', max_bytes=5 * 1024 * 1024, ttl=365 * 24 * 3600)
+chat_cache = SqliteCache('telegram_chats', max_bytes=5 * 1024 * 1024, ttl=TELEGRAM_CHAT_CACHE_TTL)
+
+_stats = {"uploads": 0, "file_id_reuses": 0, "chat_lookups": 0, "chat_cache_hits": 0, "rate_limited": 0}
+# Počítadlá menia event loopy v rôznych vláknach
+_stats_lock = threading.Lock()
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _is_chat_limit(description: Optional[str]) -> bool:
+    """Zistí, či sa 429 týka len jedného chatu; inak ide o flood-wait celého bota."""
+    description = (description or "").lower()
+    return "chat" in description or "group" in description
+
+
+async def _in_thread(fn, *args):
+    """Zavolá synchrónnu SQLite cache vo vlákne, aby nebrzdila zdieľanú slučku na pozadí."""
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+class ChatRateLimiter:
+    """Rozostupy medzi správami do jedného chatu a celkový limit pre bota."""
+
+    def __init__(self, global_rate: float):
+        self._global_interval = 1.0 / global_rate
+        self._next_global = 0.0
+        self._next_chat: Dict[str, float] = {}
+        # Limiter zdieľajú event loopy v rôznych vláknach
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chat_interval(chat_id: str) -> float:
+        # Skupiny a kanály majú záporné ID a prísnejší limit
+        return TELEGRAM_GROUP_INTERVAL if str(chat_id).startswith('-') else TELEGRAM_CHAT_INTERVAL
+
+    async def acquire(self, chat_id: Optional[str]):
+        """Rezervuje si najbližší voľný čas na odoslanie a počká naň."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_global)
+            if chat_id is not None:
+                slot = max(slot, self._next_chat.get(str(chat_id), 0.0))
+                self._next_chat[str(chat_id)] = slot + self._chat_interval(chat_id)
+            self._next_global = slot + self._global_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def penalize(self, chat_id: Optional[str], retry_after: float):
+        """Po odpovedi 429 posunie ďalšie odoslanie o retry_after sekúnd."""
+        resume = time.monotonic() + retry_after
+        with self._lock:
+            if chat_id is None:
+                self._next_global = max(self._next_global, resume)
+            else:
+                self._next_chat[str(chat_id)] = max(self._next_chat.get(str(chat_id), 0.0), resume)
+
+
+class SendQueue:
+    """Asynchrónna fronta volaní Bot API s obmedzeným počtom súbežných odoslaní."""
+
+    def __init__(self, limiter: ChatRateLimiter, workers: int = TELEGRAM_SEND_WORKERS):
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._limiter = limiter
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            loop = asyncio.get_running_loop()
+            self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+
+    async def call(self, method: str, data: Dict[str, Any], audio: Optional[bytes] = None,
+                   chat_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Zaradí volanie Bot API do fronty a počká na odpoveď.
+
+        Args:
+            method: Názov metódy (napr. "sendAudio")
+            data: Parametre volania
+            audio: Voliteľné MP3 dáta na nahratie ako pole "audio"
+            chat_id: Cieľový chat pre dodržanie limitu na chat
+
+        Returns:
+            JSON odpoveď Telegram API
+        """
+        self._ensure_workers()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((method, data, audio, chat_id, future))
+        return await future
+
+    async def _work(self):
+        while True:
+            method, data, audio, chat_id, future = await self._queue.get()
+            try:
+                if not future.cancelled():
+                    result = await self._call_with_retry(method, data, audio, chat_id)
+                    if not future.cancelled():
+                        future.set_result(result)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _call_with_retry(self, method: str, data: Dict[str, Any], audio: Optional[bytes],
+                               chat_id: Optional[str]) -> Dict[str, Any]:
+        for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+            await self._limiter.acquire(chat_id)
+            result = await _post(method, data, audio)
+            retry_after = result.get('parameters', {}).get('retry_after')
+            if result.get('error_code') != 429 or retry_after is None or attempt == TELEGRAM_MAX_RETRIES:
+                return result
+
+            _count("rate_limited")
+            logger.warning(f"Telegram obmedzil odosielanie ({method}), ďalší pokus o {retry_after} s")
+            self._limiter.penalize(chat_id, retry_after)
+            if chat_id is not None and not _is_chat_limit(result.get('description')):
+                # Flood-wait platí pre celého bota - počkajú aj odoslania do ostatných chatov
+                self._limiter.penalize(None, retry_after)
+        return result
+
+
+async def _post(method: str, data: Dict[str, Any], audio: Optional[bytes] = None) -> Dict[str, Any]:
+    """Zavolá metódu Bot API; audio sa posiela ako multipart priamo z pamäte."""
+    if not TELEGRAM_BOT_TOKEN:
+        raise RuntimeError("TELEGRAM_BOT_TOKEN nie je nastavený")
+    if audio is not None:
+        payload = aiohttp.FormData()
+        for name, value in data.items():
+            payload.add_field(name, str(value))
+        payload.add_field('audio', audio, filename='podcast.mp3', content_type='audio/mpeg')
+    else:
+        payload = {name: str(value) for name, value in data.items()}
+
+    async with http_client.get_async_session().post(f"{TELEGRAM_API_URL}/{method}", data=payload) as response:
+        return await response.json(content_type=None)
+
+
+# Limity platia pre celého bota, fronta je jedna na event loop (Flask handlery používajú slučku na pozadí)
+_limiter = ChatRateLimiter(TELEGRAM_GLOBAL_RATE)
+_send_queues = weakref.WeakKeyDictionary()
+
+
+def _get_send_queue() -> SendQueue:
+    loop = asyncio.get_running_loop()
+    send_queue = _send_queues.get(loop)
+    if send_queue is None:
+        send_queue = _send_queues[loop] = SendQueue(_limiter)
+    return send_queue
+
+
+async def send_audio_async(chat_id: str, audio_data: bytes, caption: str = "", title: str = "") -> Dict[str, Any]:
+    """
+    Odošle MP3 do chatu. Ak už bolo rovnaké audio nahraté, použije jeho file_id.
+
+    Returns:
+        JSON odpoveď Telegram API
+    """
+    audio_key = hashlib.sha256(audio_data).hexdigest()
+    data = {'chat_id': chat_id, 'caption': caption, 'title': title}
+
+    cached_file_id, _ = await _in_thread(file_id_cache.get, audio_key)
+    if cached_file_id is not None:
+        result = await _get_send_queue().call('sendAudio', {**data, 'audio': cached_file_id.decode('utf-8')}, chat_id=chat_id)
+        if result.get('ok'):
+            _count("file_id_reuses")
+            return result
+        # file_id už neplatí (napr. iný bot) - nahráme súbor znova
+        logger.info(f"Uložené file_id nebolo prijaté: {result.get('description')}")
+        await _in_thread(file_id_cache.delete, audio_key)
+
+    result = await _get_send_queue().call('sendAudio', data, audio=audio_data, chat_id=chat_id)
+    _count("uploads")
+    file_id = result.get('result', {}).get('audio', {}).get('file_id') if result.get('ok') else None
+    if file_id:
+        await _in_thread(file_id_cache.set, audio_key, file_id.encode('utf-8'))
+    return result
+
+
+async def get_chat_async(chat_id: str) -> Dict[str, Any]:
+    """Vráti odpoveď getChat pre ID alebo @meno; úspešné odpovede sa držia v cache."""
+    key = str(chat_id).lower()
+    _count("chat_lookups")
+    cached, _ = await _in_thread(chat_cache.get, key)
+    if cached is not None:
+        _count("chat_cache_hits")
+        return json.loads(cached)
+
+    result = await _get_send_queue().call('getChat', {'chat_id': chat_id})
+    if result.get('ok'):
+        await _in_thread(chat_cache.set, key, json.dumps(result, ensure_ascii=False).encode('utf-8'))
+    return result
+
+
+def send_audio(chat_id: str, audio_data: bytes, caption: str = "", title: str = "") -> Dict[str, Any]:
+    """Synchrónna verzia send_audio_async() pre Flask handlery a úlohy na pozadí."""
+    return background_loop.run(send_audio_async(chat_id, audio_data, caption, title))
+
+
+def get_chat(chat_id: str) -> Dict[str, Any]:
+    """Synchrónna verzia get_chat_async()."""
+    return background_loop.run(get_chat_async(chat_id))
+
+
+def stats() -> Dict[str, Any]:
+    """Vráti počet nahratí, opätovných použití file_id a zásahov cache chatov."""
+    with _stats_lock:
+        return dict(_stats)
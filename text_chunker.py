@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Spoločné delenie textu na časti pre preklad, sumarizáciu a text-to-speech.
+Odhaduje počet tokenov, delí na hraniciach viet (prípadne slov) a časti
+plní čo najbližšie k limitu, aby bolo čo najmenej volaní API bez straty textu.
+"""
+
+import re
+import logging
+from typing import Callable, List, Optional, Sequence
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+    TIKTOKEN_AVAILABLE = True
+except Exception:
+    TIKTOKEN_AVAILABLE = False
+    logging.info("Balíček 'tiktoken' nie je dostupný, počet tokenov sa bude odhadovať podľa dĺžky textu.")
+
+# Konzervatívny odhad pre zmes angličtiny a slovenčiny, keď tiktoken nie je dostupný
+CHARS_PER_TOKEN = 3.5
+
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?…])(\s+)')
+_WORD = re.compile(r'\S+\s*')
+
+
+def estimate_tokens(text: str) -> int:
+    """Vráti počet tokenov textu (presne s tiktoken, inak odhadom)."""
+    if TIKTOKEN_AVAILABLE:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Rozdelí text na vety v lineárnom čase.
+    Každá veta si ponechá medzery za sebou, takže "".join(vety) == text.
+    """
+    parts = _SENTENCE_BOUNDARY.split(text)
+    sentences = []
+    for i in range(0, len(parts), 2):
+        sentence = parts[i] + (parts[i + 1] if i + 1 < len(parts) else "")
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def _fits(tokens: int, chars: int, max_tokens: Optional[int], max_chars: Optional[int]) -> bool:
+    return (max_tokens is None or tokens <= max_tokens) and (max_chars is None or chars <= max_chars)
+
+
+def _split_long(piece: str, max_tokens: Optional[int], max_chars: Optional[int]) -> List[str]:
+    """Rozdelí príliš dlhú vetu na slová, príliš dlhé slovo natvrdo podľa znakov."""
+    if _fits(estimate_tokens(piece), len(piece), max_tokens, max_chars):
+        return [piece]
+
+    limit_chars = max_chars or int(max_tokens * CHARS_PER_TOKEN)
+    pieces = []
+    for word in _WORD.findall(piece):
+        if len(word) <= limit_chars:
+            pieces.append(word)
+        else:
+            pieces.extend(word[i:i + limit_chars] for i in range(0, len(word), limit_chars))
+    return pieces
+
+
+def chunk_text(text: str, max_tokens: Optional[int] = None, max_chars: Optional[int] = None) -> List[str]:
+    """
+    Rozdelí text na časti po celých vetách tak, aby žiadna neprekročila limity.
+
+    Args:
+        text: Text na rozdelenie
+        max_tokens: Maximálny počet tokenov v jednej časti
+        max_chars: Maximálny počet znakov v jednej časti (napr. limit Google alebo TTS)
+
+    Returns:
+        Zoznam častí (bez úvodných a koncových medzier)
+    """
+    if _fits(estimate_tokens(text), len(text), max_tokens, max_chars):
+        return [text] if text.strip() else []
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    current_chars = 0
+
+    for sentence in split_sentences(text):
+        for piece in _split_long(sentence, max_tokens, max_chars):
+            tokens = estimate_tokens(piece)
+            if current and not _fits(current_tokens + tokens, current_chars + len(piece), max_tokens, max_chars):
+                chunks.append("".join(current).strip())
+                current, current_tokens, current_chars = [], 0, 0
+            current.append(piece)
+            current_tokens += tokens
+            current_chars += len(piece)
+
+    if current:
+        chunks.append("".join(current).strip())
+    return [chunk for chunk in chunks if chunk]
+
+
+def pack(items: Sequence[str], max_tokens: int, max_items: Optional[int] = None,
+         size: Callable[[str], int] = estimate_tokens) -> List[List[int]]:
+    """
+    Zbalí položky (napr. segmenty transkriptu) do skupín bez ich delenia.
+
+    Args:
+        items: Texty položiek
+        max_tokens: Maximálny súčet tokenov v skupine (položka nad limit tvorí vlastnú skupinu)
+        max_items: Voliteľný maximálny počet položiek v skupine
+        size: Funkcia na výpočet veľkosti položky
+
+    Returns:
+        Zoznam skupín, každá ako zoznam indexov do items
+    """
+    groups = []
+    current = []
+    current_tokens = 0
+
+    for index, item in enumerate(items):
+        tokens = size(item)
+        if current and (current_tokens + tokens > max_tokens or (max_items and len(current) >= max_items)):
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+
+    if current:
+        groups.append(current)
+    return groups
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Lokálna cache transkriptov podľa video ID.
+Zdieľa ju webová aplikácia (/process, /replay) aj Telegram bot, takže
+opakované video sa vráti bez volania youtube-transcript.io.
+"""
+
+import os
+import json
+import zlib
+import logging
+from typing import Dict, Any, List, Optional, Tuple
+
+from cache_store import SqliteCache, FRESH, STALE
+
+logger = logging.getLogger(__name__)
+
+# Transkripty sa menia zriedka - po TTL sa ešte STALE_TTL vracajú a obnovujú na pozadí
+TRANSCRIPT_CACHE_TTL = int(os.environ.get('TRANSCRIPT_CACHE_TTL', 7 * 24 * 3600))
+TRANSCRIPT_CACHE_STALE_TTL = int(os.environ.get('TRANSCRIPT_CACHE_STALE_TTL', 30 * 24 * 3600))
+TRANSCRIPT_CACHE_MAX_MB = int(os.environ.get('TRANSCRIPT_CACHE_MAX_MB', 200))
+
+cache = SqliteCache(
+    'transcripts',
+    max_bytes=TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024,
+    ttl=TRANSCRIPT_CACHE_TTL,
+    stale_ttl=TRANSCRIPT_CACHE_STALE_TTL
+)
+
+
+def _load(video_id: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    value, state = cache.get(video_id)
+    if value is None:
+        return None, None
+    try:
+        return json.loads(zlib.decompress(value)), state
+    except (zlib.error, ValueError) as e:
+        logger.warning(f"Poškodený záznam v cache transkriptov pre {video_id}: {e}")
+        cache.delete(video_id)
+        return None, None
+
+
+def lookup(video_id: str) -> Tuple[Optional[Any], Optional[str]]:
+    """
+    Vráti surovú odpoveď API z cache.
+
+    Returns:
+        Dvojica (odpoveď API, stav FRESH/STALE) alebo (None, None)
+    """
+    entry, state = _load(video_id)
+    if entry is None:
+        return None, None
+    return entry["data"], state
+
+
+def get_segments(video_id: str) -> Optional[List[Dict[str, Any]]]:
+    """Vráti normalizované segmenty transkriptu z cache alebo None."""
+    entry, _ = _load(video_id)
+    if entry is None:
+        return None
+    return entry["segments"]
+
+
+def store(video_id: str, data: Any, segments: List[Dict[str, Any]]):
+    """Uloží surovú odpoveď API spolu s normalizovanými segmentmi."""
+    payload = json.dumps({"data": data, "segments": segments}, ensure_ascii=False, separators=(',', ':'))
+    cache.set(video_id, zlib.compress(payload.encode('utf-8')))
+
+
+def stats() -> Dict[str, Any]:
+    """Vráti štatistiky cache transkriptov."""
+    return cache.stats()
@@ -9,12 +9,19 @@ aby sme nemuseli importovať celý modul, ktorý závisí od python-telegram-bot
 
 import re
 import json
-import aiohttp
 import asyncio
 import logging
-import requests
 import os
-from typing import Dict, Any, List, Optional, Union
+import threading
+import weakref
+from array import array
+from bisect import bisect_right
+from typing import Dict, Any, AsyncIterator, Iterable, List, Optional, Tuple, Union
+
+import http_client
+import text_chunker
+import transcript_cache
+from single_flight import flight
 
 # Nastavenie logovania
 logging.basicConfig(
@@ -39,6 +46,32 @@ if not YOUTUBE_TRANSCRIPT_API_TOKEN:
     logger.warning("YOUTUBE_TRANSCRIPT_API_TOKEN nie je nastavený. Získavanie transkriptov nebude fungovať.")
 
 
+# YouTube odkazy v ľubovoľnom texte: watch?v=, youtu.be/, embed/, v/, shorts/, live/
+# (aj s www., m., music. a youtube-nocookie.com); skupina 1 je 11-znakové video ID.
+# Pred adresou nesmie byť písmeno, bodka ani pomlčka, aby sa nechytil napr. notyoutube.com
+_VIDEO_ID_RE = re.compile(
+    r'(?<![\w.-])(?:https?://)?(?:[\w-]+\.)?'
+    r'(?:youtube(?:-nocookie)?\.com/(?:[^\s?#]*\?(?:[^\s#]*?&)?v=|(?:embed|v|shorts|live)/)|youtu\.be/)'
+    r'([\w-]{11})(?![\w-])'
+)
+
+# Najviac videí spracovaných z jednej správy alebo požiadavky
+MAX_BATCH_VIDEOS = int(os.environ.get('MAX_BATCH_VIDEOS', 20))
+
+
+def extract_video_ids(text: str) -> List[str]:
+    """
+    Nájde všetky rôzne YouTube video ID v texte (jedným prechodom).
+    
+    Args:
+        text: Ľubovoľný text, napr. správa alebo vložený zoznam odkazov
+        
+    Returns:
+        Video ID v poradí prvého výskytu, bez duplicít
+    """
+    return list(dict.fromkeys(match.group(1) for match in _VIDEO_ID_RE.finditer(text)))
+
+
 def extract_video_id(url: str) -> Optional[str]:
     """
     Extrahuje YouTube video ID z URL.
@@ -49,22 +82,222 @@ def extract_video_id(url: str) -> Optional[str]:
     Returns:
         Video ID alebo None, ak sa nepodarilo extrahovať
     """
-    youtube_regex = (
-        r'(https?://)?(www\.)?'
-        '(youtube|youtu|youtube-nocookie)\.(com|be)/'
-        '(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})')
-    
-    youtube_regex_match = re.match(youtube_regex, url)
-    
-    if youtube_regex_match:
-        return youtube_regex_match.group(6)
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
+
+def _iter_raw_segments(transcript_data: Any, video_id: Optional[str] = None):
+    """
+    Prejde segmenty transkriptu v odpovedi API bez ohľadu na jej tvar
+    (dict podľa video ID alebo list s "tracks"/"transcript").
+    """
+    if isinstance(transcript_data, dict):
+        if video_id in transcript_data and isinstance(transcript_data[video_id], dict):
+            yield from transcript_data[video_id].get("transcript") or []
+            return
+        for vid_id, video_data in transcript_data.items():
+            if isinstance(video_data, dict) and "transcript" in video_data:
+                yield from video_data["transcript"]
+                return
+    elif isinstance(transcript_data, list):
+        for item in transcript_data:
+            if isinstance(item, dict):
+                if "tracks" in item and isinstance(item["tracks"], list) and len(item["tracks"]) > 0:
+                    for track in item["tracks"]:
+                        if "transcript" in track and isinstance(track["transcript"], list):
+                            yield from track["transcript"]
+                            break # Predpokladáme, že prvý nájdený je ten správny
+                elif "transcript" in item and isinstance(item["transcript"], list):
+                    yield from item["transcript"]
+
+
+class Transcript:
+    """
+    Kompaktná reprezentácia transkriptu.
+    Časy sú v poliach array('d'), text je jeden spojený reťazec a segmenty
+    sú určené offsetmi do neho - celý text je dostupný v O(1), segment podľa
+    času sa nájde v O(log n).
+    """
+
+    __slots__ = ('video_id', 'starts', 'durations', 'offsets', 'text')
+
+    def __init__(self, video_id: Optional[str], starts: array, durations: array, offsets: array, text: str):
+        self.video_id = video_id
+        self.starts = starts
+        self.durations = durations
+        # offsets[i]:offsets[i + 1] je rozsah i-teho segmentu v texte (vrátane oddeľovača)
+        self.offsets = offsets
+        self.text = text
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Dict[str, Any]], video_id: Optional[str] = None) -> 'Transcript':
+        """
+        Vytvorí transkript z ľubovoľných segmentov jedným prechodom.
+        Segmenty bez textu sa preskočia.
+        """
+        starts = array('d')
+        durations = array('d')
+        offsets = array('q', [0])
+        parts = []
+        position = 0
+
+        for segment in segments:
+            if not isinstance(segment, dict) or "text" not in segment:
+                continue
+            try:
+                start = float(segment.get("start") or 0)
+                duration = float(segment.get("duration", segment.get("dur")) or 0)
+            except (TypeError, ValueError):
+                start, duration = 0.0, 0.0
+
+            text = str(segment["text"])
+            parts.append(text)
+            position += len(text) + 1
+            starts.append(start)
+            durations.append(duration)
+            offsets.append(position)
+
+        return cls(video_id, starts, durations, offsets, " ".join(parts))
+
+    @classmethod
+    def from_response(cls, transcript_data: Any, video_id: Optional[str] = None) -> 'Transcript':
+        """
+        Vytvorí transkript priamo zo surovej odpovede youtube-transcript.io.
+        
+        Args:
+            transcript_data: Surová odpoveď API (dict alebo list)
+            video_id: Voliteľné video ID, ktoré sa v dict odpovedi hľadá ako prvé
+            
+        Returns:
+            Transcript (prázdny, ak odpoveď neobsahuje žiadne segmenty s textom)
+        """
+        return cls.from_segments(_iter_raw_segments(transcript_data, video_id), video_id)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def segment_text(self, index: int) -> str:
+        """Vráti text segmentu bez oddeľovača."""
+        return self.text[self.offsets[index]:self.offsets[index + 1] - 1]
+
+    def segment(self, index: int) -> Dict[str, Any]:
+        """Vráti segment v tvare {"text", "start", "duration"}."""
+        return {"text": self.segment_text(index), "start": self.starts[index], "duration": self.durations[index]}
+
+    def segments(self) -> List[Dict[str, Any]]:
+        """Vráti všetky segmenty ako zoznam slovníkov."""
+        return [self.segment(i) for i in range(len(self))]
+
+    def index_at(self, seconds: float) -> int:
+        """Vráti index segmentu, ktorý prebieha v danom čase (-1 pred prvým segmentom)."""
+        return bisect_right(self.starts, seconds) - 1
+
+    def split_text(self, max_chars: int) -> List[str]:
+        """
+        Rozdelí text na časti najviac max_chars znakov na hraniciach segmentov.
+        Prechádza offsety raz (lineárny čas), text segmentu dlhšieho ako limit
+        sa rozdelí po vetách.
+        """
+        parts = []
+        start = 0
+        for index in range(len(self)):
+            segment_start = self.offsets[index]
+            segment_end = self.offsets[index + 1] - 1
+            if segment_end - start <= max_chars:
+                continue
+            if segment_start > start:
+                parts.append(self.text[start:segment_start - 1])
+                start = segment_start
+            if segment_end - start > max_chars:
+                parts.extend(text_chunker.chunk_text(self.text[start:segment_end], max_chars=max_chars))
+                start = self.offsets[index + 1]
+        if start < len(self.text):
+            parts.append(self.text[start:])
+        return [part.strip() for part in parts if part.strip()]
+
+    def to_srt(self) -> str:
+        """Vráti transkript vo formáte titulkov SRT."""
+        entries = []
+        for index in range(len(self)):
+            start = self.starts[index]
+            end = start + self.durations[index]
+            entries.append(f"{index + 1}\n{_srt_time(start)} --> {_srt_time(end)}\n{self.segment_text(index)}\n")
+        return "\n".join(entries)
+
+
+def _srt_time(seconds: float) -> str:
+    """Naformátuje čas v sekundách ako HH:MM:SS,mmm."""
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
+
+
+def normalize_segments(transcript_data: Any, video_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Vytiahne segmenty transkriptu z odpovede API bez ohľadu na jej tvar.
     
-    return None
+    Args:
+        transcript_data: Surová odpoveď z youtube-transcript.io
+        video_id: Voliteľné video ID, ktoré sa v dict odpovedi hľadá ako prvé
+        
+    Returns:
+        Zoznam segmentov v tvare {"text", "start", "duration"}
+    """
+    return Transcript.from_response(transcript_data, video_id).segments()
+
+
+def cache_transcript(video_id: str, transcript_data: Any):
+    """Uloží odpoveď do cache, ak obsahuje nejaké segmenty."""
+    segments = normalize_segments(transcript_data, video_id)
+    if segments:
+        transcript_cache.store(video_id, transcript_data, segments)
+
+
+# Video ID, ktoré sa práve obnovujú na pozadí (stale-while-revalidate)
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _refresh_in_background(video_id: str):
+    """Spustí obnovu zastaraného záznamu v cache v samostatnom vlákne."""
+    with _refreshing_lock:
+        if video_id in _refreshing:
+            return
+        _refreshing.add(video_id)
+
+    def refresh():
+        try:
+            transcript_data = _fetch_transcript_sync(video_id)
+            if transcript_data:
+                cache_transcript(video_id, transcript_data)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(video_id)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+async def _in_thread(fn, *args):
+    """Spustí synchrónnu funkciu (SQLite cache, zlib, JSON) vo vlákne, aby neblokovala event loop."""
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+def get_cached_transcript(video_id: str) -> Optional[Any]:
+    """Vráti transkript z cache; zastaraný záznam vráti hneď a obnoví ho na pozadí."""
+    transcript_data, state = transcript_cache.lookup(video_id)
+    if transcript_data is None:
+        return None
+    if state == transcript_cache.STALE:
+        _refresh_in_background(video_id)
+    logger.info(f"Transkript pre {video_id} vrátený z cache ({state})")
+    return transcript_data
 
 
 async def get_transcript(video_id: str) -> Dict[str, Any]:
     """
     Získa transkript pre zadané YouTube video ID.
+    Najprv sa pozrie do lokálnej cache, API volá len pri miss.
     
     Args:
         video_id: YouTube video ID
@@ -72,39 +305,185 @@ async def get_transcript(video_id: str) -> Dict[str, Any]:
     Returns:
         Slovník obsahujúci transkript alebo chybovú správu
     """
+    transcript_data = await _in_thread(get_cached_transcript, video_id)
+    if transcript_data is not None:
+        return transcript_data
+
+    return await flight.do_async("transcript", video_id, lambda: _fetch_and_cache(video_id))
+
+
+async def _fetch_and_cache(video_id: str) -> Dict[str, Any]:
+    # Súbežné požiadavky sa zoskupia do jednej požiadavky na API
+    transcript_data = await _get_batcher().fetch(video_id)
+    if transcript_data:
+        await _in_thread(cache_transcript, video_id, transcript_data)
+    return transcript_data
+
+
+async def iter_transcripts(video_ids: List[str]) -> AsyncIterator[Tuple[str, Optional[Any]]]:
+    """
+    Získa transkripty viacerých videí súbežne a vracia ich v poradí, v akom sú hotové.
+    Súbežné miss-y sa zoskupia do požiadaviek s viacerými ID, cache hity prídu hneď.
+    
+    Args:
+        video_ids: Zoznam YouTube video ID
+        
+    Yields:
+        Dvojice (video ID, odpoveď API alebo None pri chybe)
+    """
+    async def fetch_one(video_id: str):
+        try:
+            return video_id, await get_transcript(video_id)
+        except Exception as e:
+            logger.error(f"Chyba pri získavaní transkriptu {video_id}: {e}")
+            return video_id, None
+
+    tasks = [asyncio.ensure_future(fetch_one(video_id)) for video_id in video_ids]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def get_transcript_sync(video_id: str) -> Dict[str, Any]:
+    """
+    Synchrónna verzia funkcie get_transcript.
+    Používa sa, keď asyncio nie je dostupné.
+    
+    Args:
+        video_id: YouTube video ID
+        
+    Returns:
+        Slovník obsahujúci transkript alebo chybovú správu
+    """
+    transcript_data = get_cached_transcript(video_id)
+    if transcript_data is not None:
+        return transcript_data
+
+    return flight.do("transcript", video_id, lambda: _fetch_and_cache_sync(video_id))
+
+
+def _fetch_and_cache_sync(video_id: str) -> Dict[str, Any]:
+    transcript_data = _fetch_transcript_sync(video_id)
+    if transcript_data:
+        cache_transcript(video_id, transcript_data)
+    return transcript_data
+
+
+class TranscriptApiError(Exception):
+    """Chybová odpoveď API transkriptov; pri 429 nesie aj odporúčanú pauzu v sekundách."""
+
+    def __init__(self, status: int, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"{status} - {message}")
+        self.status = status
+        self.retry_after = retry_after
+
+
+async def _fetch_transcript_batch(video_ids: List[str], raise_errors: bool = False) -> Dict[str, Any]:
+    """
+    Stiahne transkripty viacerých videí jednou požiadavkou (asynchrónne, bez cache).
+    
+    Args:
+        video_ids: Zoznam YouTube video ID
+        raise_errors: True, ak sa má chyba vyhodiť (TranscriptApiError, sieťové chyby)
+            namiesto zalogovania a prázdneho výsledku
+        
+    Returns:
+        Slovník video ID -> odpoveď API v rovnakom tvare ako pre jedno video
+    """
     try:
         url = "https://www.youtube-transcript.io/api/transcripts"
         headers = {
             "Authorization": f"Basic {YOUTUBE_TRANSCRIPT_API_TOKEN}",
             "Content-Type": "application/json"
         }
-        payload = {"ids": [video_id]}
+        payload = {"ids": video_ids}
         
-        # Asynchrónny HTTP request
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, headers=headers, json=payload) as response:
-                if response.status != 200:
-                    logger.error(f"Chyba pri získavaní transkriptu: {response.status} - {await response.text()}")
-                    return None
-                
-                return await response.json()
+        # Asynchrónny HTTP request cez zdieľanú session s poolom spojení
+        session = http_client.get_async_session()
+        async with session.post(url, headers=headers, json=payload) as response:
+            if response.status != 200:
+                retry_after = response.headers.get("Retry-After")
+                raise TranscriptApiError(
+                    response.status,
+                    await response.text(),
+                    float(retry_after) if retry_after and retry_after.isdigit() else None
+                )
+            
+            return split_batch_response(await response.json(), video_ids)
     
     except Exception as e:
+        if raise_errors:
+            raise
         logger.error(f"Chyba pri získavaní transkriptu: {e}")
-        return None
+        return {}
 
 
-def get_transcript_sync(video_id: str) -> Dict[str, Any]:
+async def fetch_transcripts(video_ids: List[str], use_cache: bool = True) -> Dict[str, Any]:
     """
-    Synchrónna verzia funkcie get_transcript.
-    Používa sa, keď asyncio nie je dostupné.
+    Získa transkripty zoznamu videí: najprv z cache, zvyšok jednou požiadavkou na API.
+    Na rozdiel od get_transcript() chyby API nepotláča, aby ich volajúci mohol zopakovať.
     
     Args:
-        video_id: YouTube video ID
+        video_ids: Zoznam YouTube video ID (jedna dávka, najviac TRANSCRIPT_BATCH_MAX_SIZE)
+        use_cache: False, ak sa má cache transkriptov úplne obísť
         
     Returns:
-        Slovník obsahujúci transkript alebo chybovú správu
+        Slovník video ID -> odpoveď API; videá bez transkriptu v ňom chýbajú
     """
+    def lookup_all():
+        return {video_id: get_cached_transcript(video_id) for video_id in video_ids}
+
+    def store_all(fetched):
+        for video_id, transcript_data in fetched.items():
+            if transcript_data:
+                cache_transcript(video_id, transcript_data)
+
+    # Celá dávka sa z cache číta aj do nej zapisuje jedným volaním vo vlákne
+    cached = await _in_thread(lookup_all) if use_cache else {}
+    results = {video_id: data for video_id, data in cached.items() if data is not None}
+    missing = [video_id for video_id in video_ids if video_id not in results]
+
+    if missing:
+        fetched = await _fetch_transcript_batch(missing, raise_errors=True)
+        if use_cache:
+            await _in_thread(store_all, fetched)
+        results.update(fetched)
+    return results
+
+
+def split_batch_response(transcript_data: Any, video_ids: List[str]) -> Dict[str, Any]:
+    """
+    Rozdelí odpoveď API pre viac video ID na odpovede pre jednotlivé videá.
+    
+    Args:
+        transcript_data: Surová odpoveď z youtube-transcript.io
+        video_ids: Video ID, ktoré boli v požiadavke
+        
+    Returns:
+        Slovník video ID -> odpoveď v tvare, aký by API vrátilo pre jedno video
+    """
+    results = {}
+    if isinstance(transcript_data, dict):
+        for vid in video_ids:
+            if vid in transcript_data:
+                results[vid] = {vid: transcript_data[vid]}
+    elif isinstance(transcript_data, list):
+        wanted = set(video_ids)
+        for item in transcript_data:
+            if isinstance(item, dict) and item.get("id") in wanted:
+                results.setdefault(item["id"], []).append(item)
+
+    # Pri jednom videu vrátime odpoveď celú, aj keď ju nevieme priradiť podľa ID
+    if not results and len(video_ids) == 1 and transcript_data:
+        results[video_ids[0]] = transcript_data
+    return results
+
+
+def _fetch_transcript_sync(video_id: str) -> Dict[str, Any]:
+    """Stiahne transkript z youtube-transcript.io (synchrónne, bez cache)."""
     try:
         url = "https://www.youtube-transcript.io/api/transcripts"
         headers = {
@@ -113,7 +492,7 @@ def get_transcript_sync(video_id: str) -> Dict[str, Any]:
         }
         payload = {"ids": [video_id]}
         
-        response = requests.post(url, headers=headers, json=payload)
+        response = http_client.get_session().post(url, headers=headers, json=payload, timeout=http_client.TIMEOUT)
         
         if response.status_code != 200:
             logger.error(f"Chyba pri získavaní transkriptu: {response.status_code} - {response.text}")
@@ -123,4 +502,92 @@ def get_transcript_sync(video_id: str) -> Dict[str, Any]:
         
     except Exception as e:
         logger.error(f"Chyba pri získavaní transkriptu: {e}")
-        return None 
\ No newline at end of file
+        return None 
+
+
+# Nastavenia pre zoskupovanie súbežných požiadaviek do jednej
+TRANSCRIPT_BATCH_MAX_SIZE = int(os.environ.get('TRANSCRIPT_BATCH_MAX_SIZE', 50))
+TRANSCRIPT_BATCH_WINDOW = float(os.environ.get('TRANSCRIPT_BATCH_WINDOW_MS', 25)) / 1000
+
+
+class TranscriptBatcher:
+    """
+    Zbiera súbežné požiadavky na transkripty počas krátkeho okna a posiela ich
+    do API jednou požiadavkou s viacerými ID. Rovnaké ID čakajú na jeden výsledok.
+    """
+
+    def __init__(self, max_batch_size: int = TRANSCRIPT_BATCH_MAX_SIZE, window: float = TRANSCRIPT_BATCH_WINDOW):
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self._pending: Dict[str, List[asyncio.Future]] = {}
+        self._timer = None
+        self.batches = 0
+        self.lookups = 0
+
+    async def fetch(self, video_id: str) -> Optional[Any]:
+        """Zaradí video ID do najbližšej dávky a počká na jeho výsledok."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.setdefault(video_id, []).append(future)
+        self.lookups += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Odošle všetky čakajúce ID ako jednu dávku."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        pending, self._pending = self._pending, {}
+        if pending:
+            self.batches += 1
+            asyncio.ensure_future(self._run(pending))
+
+    async def _run(self, pending: Dict[str, List[asyncio.Future]]):
+        video_ids = list(pending)
+        logger.info(f"Posielam dávku {len(video_ids)} video ID do API")
+        try:
+            results = await _fetch_transcript_batch(video_ids)
+        except Exception as e:
+            logger.error(f"Chyba pri dávkovom získavaní transkriptov: {e}")
+            results = {}
+
+        for vid, futures in pending.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(results.get(vid))
+
+    def stats(self) -> Dict[str, Any]:
+        """Vráti počet vyhľadávaní a odoslaných dávok."""
+        return {
+            "lookups": self.lookups,
+            "batches": self.batches,
+            "requests_saved": self.lookups - self.batches
+        }
+
+
+# Batcher je viazaný na event loop, preto má každá slučka vlastný
+_batchers = weakref.WeakKeyDictionary()
+
+
+def _get_batcher() -> TranscriptBatcher:
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = _batchers[loop] = TranscriptBatcher()
+    return batcher
+
+
+def batch_stats() -> Dict[str, int]:
+    """Vráti súhrnné štatistiky zoskupovania pre všetky event loopy v procese."""
+    result = {"lookups": 0, "batches": 0, "requests_saved": 0}
+    for batcher in list(_batchers.values()):
+        for key, value in batcher.stats().items():
+            result[key] += value
+    return result
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Perzistentná cache prekladov podľa obsahu.
+Kľúčom je hash normalizovaného textu, jazykov, prekladového modelu a verzie
+promptu, takže opakovaný preklad známeho textu nevolá OpenAI ani Google.
+"""
+
+import os
+import re
+import zlib
+import logging
+from typing import Dict, Any, Optional
+
+from cache_store import SqliteCache
+from single_flight import make_key
+
+logger = logging.getLogger(__name__)
+
+TRANSLATION_CACHE_TTL = int(os.environ.get('TRANSLATION_CACHE_TTL', 90 * 24 * 3600))
+TRANSLATION_CACHE_MAX_MB = int(os.environ.get('TRANSLATION_CACHE_MAX_MB', 100))
+
+cache = SqliteCache(
+    'translations',
+    max_bytes=TRANSLATION_CACHE_MAX_MB * 1024 * 1024,
+    ttl=TRANSLATION_CACHE_TTL
+)
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def translation_key(text: str, source: str, target: str, engine: str, prompt_version: int) -> str:
+    """Vytvorí kľúč z normalizovaného textu a parametrov prekladu."""
+    normalized = _WHITESPACE.sub(' ', text).strip()
+    return make_key(normalized, source, target, engine, prompt_version)
+
+
+def lookup(key: str) -> Optional[str]:
+    """Vráti preklad z cache alebo None."""
+    value, _ = cache.get(key)
+    if value is None:
+        return None
+    try:
+        return zlib.decompress(value).decode('utf-8')
+    except (zlib.error, UnicodeDecodeError) as e:
+        logger.warning(f"Poškodený záznam v cache prekladov: {e}")
+        cache.delete(key)
+        return None
+
+
+def store(key: str, translation: str):
+    """Uloží preklad do cache."""
+    cache.set(key, zlib.compress(translation.encode('utf-8')))
+
+
+def stats() -> Dict[str, Any]:
+    """Vráti štatistiky cache prekladov."""
+    return cache.stats()
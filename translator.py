@@ -7,9 +7,22 @@ Poznámka: Pre plnú funkčnosť tohto modulu je potrebné mať nainštalovaný
 balíček pre preklad - napr. deep-translator alebo openai.
 """
 
+import os
+import re
+import time
+import asyncio
 import logging
+import weakref
+import threading
 import configparser
-from typing import List, Dict, Any
+from typing import AsyncIterator, Awaitable, Callable, Iterator, List, Dict, Any, Optional
+
+import audio_cache
+import text_chunker
+import background_loop
+import translation_cache
+from cache_store import SqliteCache
+from single_flight import single_flight_async, make_key
 
 try:
     from deep_translator import GoogleTranslator
@@ -25,14 +38,165 @@ except ImportError:
     OPENAI_AVAILABLE = False
     logging.warning("Balíček 'openai' nie je nainštalovaný. OpenAI preklad nebude dostupný.")
 
-class TranscriptTranslator:
-    """Trieda pre preklad transkriptov z angličtiny do slovenčiny."""
+# Súbežný preklad a sumarizácia - počet súbežných volaní v jednom event loope, limit požiadaviek za minútu a počet opakovaní
+TRANSLATION_CONCURRENCY = int(os.environ.get('TRANSLATION_CONCURRENCY', 16))
+TRANSLATION_RATE_PER_MINUTE = int(os.environ.get('TRANSLATION_RATE_PER_MINUTE', 120))
+TRANSLATION_CHUNK_RETRIES = int(os.environ.get('TRANSLATION_CHUNK_RETRIES', 2))
+
+# Model a verzia promptu pre preklad - pri zmene promptu zvýš verziu, aby sa cache prekladov nepoužila
+OPENAI_TRANSLATION_MODEL = "gpt-4o"
+TRANSLATION_PROMPT_VERSION = 2  # 2: väčší výstupný limit a delenie skrátených prekladov
+
+# Limity pre delenie textu - vstup prekladu je menší ako výstupný limit, lebo slovenčina má viac tokenov
+TRANSLATION_CHUNK_TOKENS = int(os.environ.get('TRANSLATION_CHUNK_TOKENS', 1500))
+TRANSLATION_MAX_OUTPUT_TOKENS = 4096
+GOOGLE_MAX_CHARS = 5000
+TTS_MAX_CHARS = 4000
+
+# Text-to-speech - dlhý text sa delí na časti, ktoré sa generujú súbežne
+TTS_SEGMENT_CHARS = int(os.environ.get('TTS_SEGMENT_CHARS', 1500))
+TTS_CONCURRENCY = int(os.environ.get('TTS_CONCURRENCY', 6))
+
+OPENAI_TTS_MODEL = "gpt-4o-mini-tts"
+# Pri zmene spájania častí audia zvýš verziu, aby sa nepoužili staré nahrávky z cache
+TTS_AUDIO_VERSION = 2  # 2: bez Xing/Info rámcov jednotlivých častí
+
+# Dostupné hlasy OpenAI TTS
+AVAILABLE_VOICES = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
+
+# Štýly pre inštrukcie hlasu
+VOICE_STYLES = {
+    "default": "Hovor prirodzene.",
+    "slovak": "Hovor ako rodený Slovák s výbornou výslovnosťou slovenčiny.",
+    "clear": "Hovor veľmi jasne a artikuluj každé slovo, najmä slovenské znaky ako ď, ť, ň, ľ, š, č, ž.",
+    "friendly": "Hovor priateľským a vrelým tónom.",
+    "formal": "Hovor formálne a profesionálne."
+}
+
+# Sumarizácia dlhých textov (map-reduce) - nad SUMMARY_DIRECT_TOKENS sa text delí na časti,
+# ktoré sa zhrnú súbežne, a finálna sumarizácia sa robí z ich poznámok
+SUMMARY_DIRECT_TOKENS = int(os.environ.get('SUMMARY_DIRECT_TOKENS', 16000))
+SUMMARY_CHUNK_TOKENS = int(os.environ.get('SUMMARY_CHUNK_TOKENS', 8000))
+SUMMARY_PROMPT_VERSION = 1
+SUMMARY_CACHE_MAX_MB = int(os.environ.get('SUMMARY_CACHE_MAX_MB', 50))
+
+# Dávkový preklad segmentov transkriptu - maximálny počet tokenov a segmentov v jednej požiadavke
+SEGMENT_BATCH_TOKENS = int(os.environ.get('SEGMENT_BATCH_TOKENS', 1000))
+SEGMENT_BATCH_SIZE = int(os.environ.get('SEGMENT_BATCH_SIZE', 100))
+_SEGMENT_MARKER = re.compile(r'^\s*\[\[(\d+)\]\]\s?(.*)$', re.MULTILINE)
+
+
+# Cache poznámok z častí textu - zdieľa ju stručná aj podrobná sumarizácia
+chunk_summary_cache = SqliteCache(
+    'chunk_summaries',
+    max_bytes=SUMMARY_CACHE_MAX_MB * 1024 * 1024,
+    ttl=30 * 24 * 3600
+)
+
+
+def _id3_length(audio_data: bytes) -> int:
+    """Vráti dĺžku ID3v2 hlavičky na začiatku MP3 dát (0, ak tam nie je)."""
+    if len(audio_data) < 10 or audio_data[:3] != b"ID3":
+        return 0
+    # Veľkosť je "syncsafe" celé číslo - 4 bajty po 7 bitoch
+    size = (audio_data[6] << 21) | (audio_data[7] << 14) | (audio_data[8] << 7) | audio_data[9]
+    footer = 10 if audio_data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _strip_id3(audio_data: bytes) -> bytes:
+    """Odstráni ID3v2 hlavičku zo začiatku MP3 dát (aby sa dali časti spojiť za sebou)."""
+    return audio_data[_id3_length(audio_data):]
+
+
+# Bitové rýchlosti (kb/s) a vzorkovacie frekvencie MPEG Layer III podľa verzie
+_MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _strip_vbr_header(audio_data: bytes) -> bytes:
+    """
+    Odstráni prvý MPEG rámec, ak nesie hlavičku Xing/Info (LAME) alebo VBRI.
+    Tá opisuje dĺžku a tabuľku posunov len svojej časti, takže v spojenom podcaste
+    by prehrávače zobrazili trvanie prvej časti. ID3 hlavička zostane zachovaná.
+    """
+    start = _id3_length(audio_data)
+    header = audio_data[start:start + 4]
+    if len(header) < 4 or header[0] != 0xFF or header[1] & 0xE0 != 0xE0:
+        return audio_data
+
+    version = (header[1] >> 3) & 0x03
+    layer = (header[1] >> 1) & 0x03
+    bitrate_index = header[2] >> 4
+    rate_index = (header[2] >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return audio_data
+
+    bitrate = _MP3_BITRATES[3 if version == 3 else 2][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (header[2] >> 1) & 0x01
+    frame_length = (144 if version == 3 else 72) * bitrate // sample_rate + padding
+
+    # Xing/Info je hneď za bočnými informáciami (ich dĺžka závisí od verzie a mono/stereo), VBRI na pozícii 36
+    mono = header[3] >> 6 == 3
+    side_info = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+    frame = audio_data[start:start + frame_length]
+    if frame[4 + side_info:8 + side_info] in (b"Xing", b"Info") or frame[36:40] == b"VBRI":
+        return audio_data[:start] + audio_data[start + frame_length:]
+    return audio_data
+
+
+async def _in_thread(fn: Callable, *args):
+    """Spustí synchrónnu funkciu (napr. SQLite cache) vo vlákne, aby neblokovala zdieľaný event loop."""
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+class RateLimiter:
+    """Rovnomerne rozkladá požiadavky v čase tak, aby neprekročili limit za minútu."""
+    
+    def __init__(self, rate_per_minute: int):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        # Limit zdieľajú event loopy vo viacerých vláknach (slučka na pozadí, bot)
+        self._lock = threading.Lock()
+    
+    async def acquire(self):
+        """Počká, kým je k dispozícii ďalší slot pre požiadavku."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AsyncTranscriptTranslator:
+    """
+    Asynchrónny prekladač transkriptov z angličtiny do slovenčiny.
+    Všetky volania OpenAI idú cez AsyncOpenAI, počet súbežných volaní je obmedzený
+    semaforom a zrušenie korutiny zruší aj jej rozpracované podúlohy.
+    """
     
     def __init__(self):
         """Inicializácia prekladača."""
         self.translator = None
-        self.openai_client = None
         self.openai_available = False
+        self._api_key = None
+        
+        # Klient a semafory sú viazané na event loop (slučka na pozadí, bot)
+        self._clients = weakref.WeakKeyDictionary()
+        self._limits = weakref.WeakKeyDictionary()
+        self._openai_rate_limiter = RateLimiter(TRANSLATION_RATE_PER_MINUTE)
+        self._google_rate_limiter = RateLimiter(TRANSLATION_RATE_PER_MINUTE)
+        
+        # Počet odpovedí skrátených limitom max_tokens podľa operácie
+        self.truncated_outputs = {}
+        self._truncated_lock = threading.Lock()
         
         # Inicializácia Google prekladača
         if TRANSLATOR_AVAILABLE:
@@ -45,8 +209,6 @@ class TranscriptTranslator:
         if OPENAI_AVAILABLE:
             try:
                 # Načítanie OpenAI API kľúča LEN z environment premennej
-                import os
-                
                 api_key = os.environ.get('OPENAI_API_KEY')
                 # Diagnostický logging - vypíšeme prvých a posledných 5 znakov kľúča pre overenie
                 if api_key:
@@ -58,7 +220,7 @@ class TranscriptTranslator:
                     logging.info(f"Dostupné environment premenné: {', '.join(env_vars)}")
                     
                     openai.api_key = api_key
-                    self.openai_client = openai.OpenAI(api_key=api_key)
+                    self._api_key = api_key
                     self.openai_available = True
                     logging.info("OpenAI prekladač úspešne inicializovaný")
                 else:
@@ -66,11 +228,36 @@ class TranscriptTranslator:
             except Exception as e:
                 logging.error(f"Chyba pri inicializácii OpenAI klienta: {e}")
     
+    def _client(self) -> 'openai.AsyncOpenAI':
+        """Vráti AsyncOpenAI klienta pre aktuálny event loop."""
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = openai.AsyncOpenAI(api_key=self._api_key)
+        return client
+    
+    def _limit(self, kind: str) -> asyncio.Semaphore:
+        """Vráti semafor pre textové ('text') alebo TTS ('tts') volania v aktuálnom event loope."""
+        loop = asyncio.get_running_loop()
+        limits = self._limits.get(loop)
+        if limits is None:
+            limits = self._limits[loop] = {
+                "text": asyncio.Semaphore(TRANSLATION_CONCURRENCY),
+                "tts": asyncio.Semaphore(TTS_CONCURRENCY)
+            }
+        return limits[kind]
+    
+    async def _chat(self, **kwargs):
+        """Zavolá chat.completions.create v rámci limitu súbežných volaní."""
+        async with self._limit("text"):
+            return await self._client().chat.completions.create(**kwargs)
+    
     def is_available(self) -> bool:
         """Vráti True, ak je aspoň jeden prekladač dostupný."""
         return self.translator is not None or self.openai_available
     
-    def translate_text(self, text: str) -> str:
+    @single_flight_async("translate")
+    async def translate_text(self, text: str) -> str:
         """Preloží text z angličtiny do slovenčiny."""
         if not self.is_available():
             return text
@@ -78,7 +265,9 @@ class TranscriptTranslator:
         # Skúsime preklad cez OpenAI ak je dostupný
         if self.openai_available:
             try:
-                return self._translate_with_openai(text)
+                return await self._translate_with_openai(text)
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logging.error(f"Chyba pri OpenAI preklade textu: {e}")
                 # Fallback na Google prekladač
@@ -87,140 +276,234 @@ class TranscriptTranslator:
         if self.translator:
             try:
                 # Rozdelíme text na menšie časti, aby sa zmestil do limitu Google Translator
-                max_chunk_size = 5000
-                if len(text) <= max_chunk_size:
-                    return self.translator.translate(text)
-                
-                # Rozdelenie textu na vety a preklad po častiach
-                chunks = []
-                current_chunk = ""
-                for sentence in text.split('. '):
-                    if len(current_chunk) + len(sentence) + 2 <= max_chunk_size:
-                        current_chunk += sentence + '. '
-                    else:
-                        chunks.append(current_chunk)
-                        current_chunk = sentence + '. '
-                
-                if current_chunk:
-                    chunks.append(current_chunk)
-                
-                translated_text = ""
-                for chunk in chunks:
-                    translated_text += self.translator.translate(chunk) + " "
-                    
-                return translated_text.strip()
-                
+                chunks = text_chunker.chunk_text(text, max_chars=GOOGLE_MAX_CHARS)
+                translated = await self._translate_chunks(chunks, self._google_translate_chunk, self._google_rate_limiter, "google")
+                return " ".join(part.strip() for part in translated)
+            
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
                 logging.error(f"Chyba pri Google preklade textu: {e}")
         
         # Ak sme tu, obidva preklady zlyhali
         return text
     
-    def _translate_with_openai(self, text: str) -> str:
-        """Preloží text pomocou OpenAI API."""
-        if not self.openai_client:
+    async def _google_translate_chunk(self, chunk: str) -> str:
+        """Preloží jednu časť textu Google prekladačom (synchrónna knižnica beží vo vlákne)."""
+        async with self._limit("text"):
+            return await asyncio.get_running_loop().run_in_executor(None, self.translator.translate, chunk)
+    
+    def _completion_text(self, response, operation: str) -> str:
+        """Vráti text odpovede a zaznamená, ak bola skrátená limitom max_tokens."""
+        choice = response.choices[0]
+        if getattr(choice, "finish_reason", None) == "length":
+            self._count_truncated(operation)
+        return (choice.message.content or "").strip()
+    
+    def _count_truncated(self, operation: str):
+        with self._truncated_lock:
+            self.truncated_outputs[operation] = self.truncated_outputs.get(operation, 0) + 1
+        logging.warning(f"Výstup operácie '{operation}' bol skrátený limitom max_tokens")
+    
+    async def _condense_for_summary(self, text: str) -> str:
+        """
+        Pripraví dlhý text na sumarizáciu (map-reduce).
+        Krátky text vráti bez zmeny, dlhý rozdelí na časti, tie súbežne zhrnie
+        do poznámok a vráti ich spojené (pri veľmi dlhom texte aj viacúrovňovo).
+        """
+        if text_chunker.estimate_tokens(text) <= SUMMARY_DIRECT_TOKENS:
             return text
         
-        try:
-            # Rozdelenie textu na menšie časti pre OpenAI
-            max_chunk_size = 4000  # OpenAI má vyšší limit ako Google
-            
-            if len(text) <= max_chunk_size:
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": "Si prekladateľ špecializujúci sa na preklad z angličtiny do slovenčiny. Preklad by mal byť plynulý a zachovávať význam a štýl originálu. DÔLEŽITÉ: Tvoja odpoveď musí vždy začínať priamo prekladom bez akýchkoľvek úvodných fráz alebo zdvorilostných formulácií ako 'Samozrejme', 'Prosím', 'Tu je preklad', 'Preklad:', atď. Nikdy nepridávaj takéto úvodné frázy."},
-                        {"role": "user", "content": f"Preložte nasledujúci text z angličtiny do slovenčiny. Iba preklad, žiadne dodatočné vysvetlenia alebo úvody:\n\n{text}"}
-                    ],
-                    temperature=0.3,
-                    max_tokens=1000
-                )
-                return response.choices[0].message.content.strip()
-            
-            # Pre dlhšie texty ich rozdelíme na menšie časti
-            chunks = []
-            current_chunk = ""
-            for sentence in text.split('. '):
-                if len(current_chunk) + len(sentence) + 2 <= max_chunk_size:
-                    current_chunk += sentence + '. '
-                else:
-                    chunks.append(current_chunk)
-                    current_chunk = sentence + '. '
-            
-            if current_chunk:
-                chunks.append(current_chunk)
-            
-            translated_text = ""
-            for chunk in chunks:
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=[
-                        {"role": "system", "content": "Si prekladateľ špecializujúci sa na preklad z angličtiny do slovenčiny. Preklad by mal byť plynulý a zachovávať význam a štýl originálu. DÔLEŽITÉ: Tvoja odpoveď musí vždy začínať priamo prekladom bez akýchkoľvek úvodných fráz alebo zdvorilostných formulácií ako 'Samozrejme', 'Prosím', 'Tu je preklad', 'Preklad:', atď. Nikdy nepridávaj takéto úvodné frázy."},
-                        {"role": "user", "content": f"Preložte nasledujúci text z angličtiny do slovenčiny. Iba preklad, žiadne dodatočné vysvetlenia alebo úvody:\n\n{chunk}"}
-                    ],
-                    temperature=0.3,
-                    max_tokens=1000
-                )
-                translated_text += response.choices[0].message.content.strip() + " "
-            
-            return translated_text.strip()
+        chunks = text_chunker.chunk_text(text, max_tokens=SUMMARY_CHUNK_TOKENS)
+        logging.info(f"Dlhý text sumarizujem po častiach ({len(chunks)} častí)")
+        notes = await asyncio.gather(*(self._summarize_chunk_cached(chunk) for chunk in chunks))
+        combined = "\n\n".join(note for note in notes if note)
+        
+        # Ak sa ani poznámky nezmestia do jednej sumarizácie, zopakujeme krok nad nimi
+        if len(chunks) > 1 and text_chunker.estimate_tokens(combined) > SUMMARY_DIRECT_TOKENS:
+            return await self._condense_for_summary(combined)
+        return combined
+    
+    async def _summarize_chunk_cached(self, chunk: str) -> str:
+        """Zhrnie jednu časť textu do poznámok, výsledok berie z cache, ak existuje."""
+        key = make_key(" ".join(chunk.split()), "gpt-4o", SUMMARY_PROMPT_VERSION)
+        cached, _ = await _in_thread(chunk_summary_cache.get, key)
+        if cached is not None:
+            return cached.decode('utf-8')
+        
+        notes = await self._call_with_retry(self._summarize_chunk, chunk, self._openai_rate_limiter)
+        if notes:
+            await _in_thread(chunk_summary_cache.set, key, notes.encode('utf-8'))
+        return notes
+    
+    async def _summarize_chunk(self, chunk: str) -> str:
+        """Zhrnie jednu časť dlhého textu do podrobných poznámok pomocou OpenAI API."""
+        response = await self._chat(
+            model="gpt-4o",
+            messages=[
+                {"role": "system", "content": "Si asistent, ktorý spracúva dlhý prepis po častiach. Z poskytnutej časti vytvor podrobné poznámky v slovenčine. Zachovaj všetky dôležité fakty, mená, čísla a myšlienky v poradí, v akom odzneli. Nepridávaj úvodné frázy ani vlastné komentáre."},
+                {"role": "user", "content": f"Vytvor poznámky z nasledujúcej časti prepisu:\n\n{chunk}"}
+            ],
+            temperature=0.3,
+            max_tokens=1000
+        )
+        return self._completion_text(response, "summarize_chunk")
+    
+    @staticmethod
+    async def _call_with_retry(fn: Callable[[str], Awaitable[str]], chunk: str, rate_limiter: RateLimiter) -> str:
+        """Zavolá fn(chunk) v rámci limitu požiadaviek a pri chybe to zopakuje s narastajúcou pauzou."""
+        for attempt in range(TRANSLATION_CHUNK_RETRIES + 1):
+            await rate_limiter.acquire()
+            try:
+                return await fn(chunk)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt == TRANSLATION_CHUNK_RETRIES:
+                    raise
+                logging.warning(f"Spracovanie časti textu zlyhalo ({e}), opakujem pokus {attempt + 1}/{TRANSLATION_CHUNK_RETRIES}")
+                await asyncio.sleep(2 ** attempt)
+    
+    async def _translate_chunks(self, chunks: List[str], translate_chunk: Callable[[str], Awaitable[str]], rate_limiter: RateLimiter, engine: str) -> List[str]:
+        """
+        Preloží časti textu súbežne a vráti preklady v pôvodnom poradí.
+        Súbežnosť je obmedzená semaforom, pri chybe sa opakuje len daná časť.
+        Už preložené časti sa berú z cache prekladov.
+        """
+        async def translate_with_retry(chunk: str) -> str:
+            key = translation_cache.translation_key(chunk, 'en', 'sk', engine, TRANSLATION_PROMPT_VERSION)
+            cached = await _in_thread(translation_cache.lookup, key)
+            if cached is not None:
+                return cached
             
+            translated = await self._call_with_retry(translate_chunk, chunk, rate_limiter)
+            if translated:
+                await _in_thread(translation_cache.store, key, translated)
+            return translated
+        
+        return list(await asyncio.gather(*(translate_with_retry(chunk) for chunk in chunks)))
+    
+    async def _translate_with_openai(self, text: str) -> str:
+        """Preloží text pomocou OpenAI API."""
+        try:
+            # Rozdelenie textu na menšie časti pre OpenAI (OpenAI má vyšší limit ako Google)
+            chunks = text_chunker.chunk_text(text, max_tokens=TRANSLATION_CHUNK_TOKENS)
+            translated = await self._translate_chunks(chunks, self._openai_translate_chunk, self._openai_rate_limiter, f"openai:{OPENAI_TRANSLATION_MODEL}")
+            return " ".join(translated).strip()
+        
         except Exception as e:
             logging.error(f"Chyba pri OpenAI preklade: {e}")
             raise
     
-    def summarize_text(self, text: str) -> str:
+    async def _openai_translate_chunk(self, chunk: str) -> str:
+        """Preloží jednu časť textu pomocou OpenAI API."""
+        response = await self._chat(
+            model=OPENAI_TRANSLATION_MODEL,
+            messages=[
+                {"role": "system", "content": "Si prekladateľ špecializujúci sa na preklad z angličtiny do slovenčiny. Preklad by mal byť plynulý a zachovávať význam a štýl originálu. DÔLEŽITÉ: Tvoja odpoveď musí vždy začínať priamo prekladom bez akýchkoľvek úvodných fráz alebo zdvorilostných formulácií ako 'Samozrejme', 'Prosím', 'Tu je preklad', 'Preklad:', atď. Nikdy nepridávaj takéto úvodné frázy."},
+                {"role": "user", "content": f"Preložte nasledujúci text z angličtiny do slovenčiny. Iba preklad, žiadne dodatočné vysvetlenia alebo úvody:\n\n{chunk}"}
+            ],
+            temperature=0.3,
+            max_tokens=TRANSLATION_MAX_OUTPUT_TOKENS
+        )
+        
+        if getattr(response.choices[0], "finish_reason", None) == "length":
+            # Preklad sa nezmestil do výstupu - časť rozdelíme na polovice, aby sa nestratil text
+            halves = text_chunker.chunk_text(chunk, max_tokens=max(1, text_chunker.estimate_tokens(chunk) // 2))
+            if len(halves) > 1:
+                logging.warning(f"Preklad časti bol skrátený, delím ju na {len(halves)} menšie časti")
+                return " ".join(await asyncio.gather(*(self._openai_translate_chunk(half) for half in halves)))
+        return self._completion_text(response, "translate")
+    
+    def _summary_request(self, text: str, detailed: bool) -> Dict[str, Any]:
+        """Vráti parametre požiadavky na stručnú (500 tokenov) alebo podrobnú (4000 tokenov) sumarizáciu."""
+        if detailed:
+            messages = [
+                {"role": "system", "content": "Si asistent špecializujúci sa na podrobnú sumarizáciu textov. Tvojou úlohou je vytvoriť komplexnú, informatívnu a podrobnú sumarizáciu poskytnutého textu v slovenčine. Zachovaj všetky dôležité detaily, kľúčové myšlienky, fakty a hlavné body. Rozdeľ text do tematických celkov s podnadpismi, ak je to vhodné. DÔLEŽITÉ: Tvoja odpoveď musí vždy začínať priamo sumarizáciou bez akýchkoľvek úvodných fráz alebo zdvorilostných formulácií ako 'Samozrejme', 'Prosím', 'Tu je sumarizácia', 'Sumarizácia:', atď. Nikdy nepridávaj takéto úvodné frázy."},
+                {"role": "user", "content": f"Vytvor podrobnú sumarizáciu nasledujúceho textu v slovenčine bez akýchkoľvek úvodných fráz alebo zdvorilostných formulácií. Sumarizácia by mala byť obsiahla a detailná, zachyť čo najviac relevantných informácií:\n\n{text}"}
+            ]
+            max_tokens = 4000
+        else:
+            messages = [
+                {"role": "system", "content": "Si asistent špecializujúci sa na sumarizáciu textov. Tvojou úlohou je vytvoriť výstižnú a informatívnu sumarizáciu poskytnutého textu v slovenčine. Zachovaj kľúčové myšlienky, fakty a hlavné body. DÔLEŽITÉ: Tvoja odpoveď musí vždy začínať priamo sumarizáciou bez akýchkoľvek úvodných fráz alebo zdvorilostných formulácií ako 'Samozrejme', 'Prosím', 'Tu je sumarizácia', 'Sumarizácia:', atď. Nikdy nepridávaj takéto úvodné frázy."},
+                {"role": "user", "content": f"Sumarizuj nasledujúci text v slovenčine bez akýchkoľvek úvodných fráz alebo zdvorilostných formulácií:\n\n{text}"}
+            ]
+            max_tokens = 500
+        return {"model": "gpt-4o", "messages": messages, "temperature": 0.3, "max_tokens": max_tokens}
+    
+    @single_flight_async("summarize")
+    async def summarize_text(self, text: str) -> str:
         """Sumarizuje text pomocou OpenAI API."""
         if not self.openai_available:
             return "Sumarizácia nie je dostupná - OpenAI API nie je nakonfigurované."
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "Si asistent špecializujúci sa na sumarizáciu textov. Tvojou úlohou je vytvoriť výstižnú a informatívnu sumarizáciu poskytnutého textu v slovenčine. Zachovaj kľúčové myšlienky, fakty a hlavné body. DÔLEŽITÉ: Tvoja odpoveď musí vždy začínať priamo sumarizáciou bez akýchkoľvek úvodných fráz alebo zdvorilostných formulácií ako 'Samozrejme', 'Prosím', 'Tu je sumarizácia', 'Sumarizácia:', atď. Nikdy nepridávaj takéto úvodné frázy."},
-                    {"role": "user", "content": f"Sumarizuj nasledujúci text v slovenčine bez akýchkoľvek úvodných fráz alebo zdvorilostných formulácií:\n\n{text}"}
-                ],
-                temperature=0.3,
-                max_tokens=500
-            )
-            
-            return response.choices[0].message.content.strip()
+            text = await self._condense_for_summary(text)
+            response = await self._chat(**self._summary_request(text, detailed=False))
             
+            return self._completion_text(response, "summarize")
+        
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logging.error(f"Chyba pri sumarizácii textu: {e}")
             return f"Chyba pri sumarizácii textu: {str(e)}"
     
-    def detailed_summarize_text(self, text: str) -> str:
+    @single_flight_async("detailed_summarize")
+    async def detailed_summarize_text(self, text: str) -> str:
         """Vytvorí podrobnú sumarizáciu textu pomocou OpenAI API s limitom 4000 tokenov."""
         if not self.openai_available:
             return "Podrobná sumarizácia nie je dostupná - OpenAI API nie je nakonfigurované."
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "Si asistent špecializujúci sa na podrobnú sumarizáciu textov. Tvojou úlohou je vytvoriť komplexnú, informatívnu a podrobnú sumarizáciu poskytnutého textu v slovenčine. Zachovaj všetky dôležité detaily, kľúčové myšlienky, fakty a hlavné body. Rozdeľ text do tematických celkov s podnadpismi, ak je to vhodné. DÔLEŽITÉ: Tvoja odpoveď musí vždy začínať priamo sumarizáciou bez akýchkoľvek úvodných fráz alebo zdvorilostných formulácií ako 'Samozrejme', 'Prosím', 'Tu je sumarizácia', 'Sumarizácia:', atď. Nikdy nepridávaj takéto úvodné frázy."},
-                    {"role": "user", "content": f"Vytvor podrobnú sumarizáciu nasledujúceho textu v slovenčine bez akýchkoľvek úvodných fráz alebo zdvorilostných formulácií. Sumarizácia by mala byť obsiahla a detailná, zachyť čo najviac relevantných informácií:\n\n{text}"}
-                ],
-                temperature=0.3,
-                max_tokens=4000
-            )
-            
-            return response.choices[0].message.content.strip()
+            text = await self._condense_for_summary(text)
+            response = await self._chat(**self._summary_request(text, detailed=True))
             
+            return self._completion_text(response, "detailed_summarize")
+        
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logging.error(f"Chyba pri podrobnej sumarizácii textu: {e}")
             return f"Chyba pri podrobnej sumarizácii textu: {str(e)}"
     
-    def text_to_speech(self, text: str, voice: str = "alloy", style: str = "default") -> bytes:
+    async def stream_summary(self, text: str, detailed: bool = False) -> AsyncIterator[str]:
+        """
+        Sumarizuje text a vracia odpoveď po častiach hneď, ako ich OpenAI generuje.
+        
+        Args:
+            text: Text na sumarizáciu
+            detailed: True pre podrobnú sumarizáciu
+        
+        Returns:
+            Asynchrónny generátor častí textu sumarizácie (chyby sa šíria ako výnimky)
+        """
+        if not self.openai_available:
+            yield "Sumarizácia nie je dostupná - OpenAI API nie je nakonfigurované."
+            return
+        
+        operation = "detailed_summarize" if detailed else "summarize"
+        text = await self._condense_for_summary(text)
+        stream = await self._chat(**self._summary_request(text, detailed), stream=True)
+        
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            if choice.delta and choice.delta.content:
+                yield choice.delta.content
+            if choice.finish_reason == "length":
+                self._count_truncated(operation)
+    
+    @single_flight_async("text_to_speech")
+    async def text_to_speech(self, text: str, voice: str = "alloy", style: str = "default") -> Optional[bytes]:
         """Prevádza text na reč pomocou OpenAI API.
         
         Args:
             text: Text, ktorý sa má previesť na reč
             voice: Hlas, ktorý sa má použiť (alloy, echo, fable, onyx, nova, shimmer)
             style: Štýl výslovnosti (default, slovak, clear, friendly, formal)
-            
+        
         Returns:
             Zvukový súbor vo formáte bytes
         """
@@ -228,72 +511,236 @@ class TranscriptTranslator:
             logging.error("Text-to-speech nie je dostupný - OpenAI API nie je nakonfigurované.")
             return None
         
-        # Dostupné hlasy
-        AVAILABLE_VOICES = ["alloy", "echo", "fable", "onyx", "nova", "shimmer"]
+        try:
+            # Časti sa generujú súbežne, celkový čas je približne čas najpomalšej z nich
+            return b"".join([part async for part in self.iter_speech(text, voice, style)])
+        
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Chyba pri prevode textu na reč: {e}")
+            return None
+    
+    async def iter_speech(self, text: str, voice: str = "alloy", style: str = "default") -> AsyncIterator[bytes]:
+        """
+        Prevedie text na reč po častiach a vracia MP3 dáta v správnom poradí.
+        Všetky časti sa generujú súbežne, prvá sa vráti hneď, ako je hotová,
+        takže sa dá streamovať klientovi, kým sa ďalšie ešte generujú.
+        
+        Args:
+            text: Text, ktorý sa má previesť na reč
+            voice: Hlas, ktorý sa má použiť (alloy, echo, fable, onyx, nova, shimmer)
+            style: Štýl výslovnosti (default, slovak, clear, friendly, formal)
+        
+        Returns:
+            Asynchrónny generátor MP3 dát jednotlivých častí (chyby sa šíria ako výnimky)
+        """
         if voice not in AVAILABLE_VOICES:
             logging.warning(f"Neplatný hlas: {voice}, použije sa predvolený hlas 'alloy'")
             voice = "alloy"
         
-        # Štýly pre inštrukcie hlasu
-        VOICE_STYLES = {
-            "default": "Hovor prirodzene.",
-            "slovak": "Hovor ako rodený Slovák s výbornou výslovnosťou slovenčiny.",
-            "clear": "Hovor veľmi jasne a artikuluj každé slovo, najmä slovenské znaky ako ď, ť, ň, ľ, š, č, ž.",
-            "friendly": "Hovor priateľským a vrelým tónom.",
-            "formal": "Hovor formálne a profesionálne."
-        }
-        
         if style not in VOICE_STYLES:
             logging.warning(f"Neplatný štýl: {style}, použije sa predvolený štýl 'default'")
             style = "default"
         
+        # Rovnaký text s rovnakým hlasom a štýlom už môže byť vygenerovaný
+        cache_key = audio_cache.audio_key(text, "openai", voice, style, f"{OPENAI_TTS_MODEL}:v{TTS_AUDIO_VERSION}")
+        cached = await _in_thread(audio_cache.lookup, cache_key)
+        if cached is not None:
+            logging.info("Audio vrátené z cache")
+            yield cached
+            return
+        
+        # Inštrukcia pre štýl výslovnosti ide len pred prvú časť (ako pri jednom volaní)
+        prefix = f"{VOICE_STYLES[style]}\n\n" if style != "default" else ""
+        
+        # Text rozdelíme po vetách tak, aby sa každá časť aj s prefixom zmestila do limitu
+        chunks = text_chunker.chunk_text(text, max_chars=min(TTS_SEGMENT_CHARS, TTS_MAX_CHARS - len(prefix)))
+        if len(chunks) > 1:
+            logging.info(f"Text ({len(text)} znakov) sa prevedie na reč v {len(chunks)} častiach")
+        
+        tasks = [
+            asyncio.ensure_future(self._synthesize_speech(f"{prefix}{chunk}" if index == 0 else chunk, voice))
+            for index, chunk in enumerate(chunks)
+        ]
+        audio_parts = []
         try:
-            # Maximálny počet znakov pre jeden vstup do OpenAI API
-            MAX_INPUT_CHARS = 4000
-            
-            # Ak text presahuje maximálnu dĺžku, skrátime ho
-            if len(text) > MAX_INPUT_CHARS:
-                logging.warning(f"Text je príliš dlhý ({len(text)} znakov). Bude skrátený na {MAX_INPUT_CHARS} znakov.")
-                text = text[:MAX_INPUT_CHARS]
-            
-            # Pridanie inštrukcie pre štýl výslovnosti ako prefix k textu
-            voice_style = VOICE_STYLES[style]
-            if style != "default":
-                styled_text = f"{voice_style}\n\n{text}"
-            else:
-                styled_text = text
-            
-            # Generovanie hlasovej správy pomocou OpenAI TTS API
-            speech_response = self.openai_client.audio.speech.create(
-                model="gpt-4o-mini-tts",
+            for index, task in enumerate(tasks):
+                audio_data = await task
+                # ID3 hlavičku necháme len na začiatku, ďalšie časti sú len MP3 rámce; Xing/Info
+                # rámec s dĺžkou jednej časti pri viacerých častiach odstránime zo všetkých
+                if len(tasks) > 1:
+                    audio_data = _strip_vbr_header(audio_data if index == 0 else _strip_id3(audio_data))
+                audio_parts.append(audio_data)
+                yield audio_parts[-1]
+            await _in_thread(audio_cache.store, cache_key, b"".join(audio_parts))
+        finally:
+            # Ak klient prestal čítať, nastala chyba alebo zrušenie, nedokončené časti zrušíme
+            for task in tasks:
+                task.cancel()
+    
+    async def _synthesize_speech(self, text: str, voice: str) -> bytes:
+        """Vygeneruje reč pre jednu časť textu pomocou OpenAI TTS API."""
+        async with self._limit("tts"):
+            speech_response = await self._client().audio.speech.create(
+                model=OPENAI_TTS_MODEL,
                 voice=voice,
-                input=styled_text,
+                input=text,
                 response_format="mp3"
             )
-            
-            # Získanie audio dát
-            audio_data = speech_response.content
-            
-            return audio_data
-            
-        except Exception as e:
-            logging.error(f"Chyba pri prevode textu na reč: {e}")
-            return None
+        return speech_response.content
     
-    def translate_transcript(self, transcript: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Preloží všetky textové časti transkriptu."""
+    async def translate_transcript(self, transcript: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Preloží všetky textové časti transkriptu.
+        S OpenAI sa segmenty posielajú po dávkach s očíslovanými značkami,
+        časy start/duration zostávajú nezmenené.
+        """
         if not self.is_available():
             return transcript
         
         try:
-            for segment in transcript:
-                if "text" in segment:
-                    segment["text"] = self.translate_text(segment["text"])
+            if self.openai_available:
+                await self._translate_segments_batched(transcript)
+            else:
+                translated = await asyncio.gather(*(self.translate_text(segment["text"]) for segment in transcript if "text" in segment))
+                for segment, text in zip((segment for segment in transcript if "text" in segment), translated):
+                    segment["text"] = text
             return transcript
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logging.error(f"Chyba pri preklade transkriptu: {e}")
             return transcript
+    
+    async def _translate_segments_batched(self, transcript: List[Dict[str, Any]]):
+        """Preloží segmenty po dávkach; dávky s nečitateľnou odpoveďou sa preložia po segmentoch."""
+        engine = f"openai:{OPENAI_TRANSLATION_MODEL}"
+        
+        # Segmenty, ktoré už máme preložené v cache, do dávok neposielame
+        def lookup_cached():
+            pending = []
+            for segment in transcript:
+                if "text" not in segment or not str(segment["text"]).strip():
+                    continue
+                key = translation_cache.translation_key(segment["text"], 'en', 'sk', engine, TRANSLATION_PROMPT_VERSION)
+                cached = translation_cache.lookup(key)
+                if cached is not None:
+                    segment["text"] = cached
+                else:
+                    pending.append((segment, key))
+            return pending
+        
+        pending = await _in_thread(lookup_cached)
+        
+        # Zabalenie segmentov do dávok podľa počtu tokenov a segmentov
+        groups = text_chunker.pack([segment["text"] for segment, _ in pending], SEGMENT_BATCH_TOKENS, SEGMENT_BATCH_SIZE)
+        batches = [[pending[i] for i in group] for group in groups]
+        
+        results = await asyncio.gather(*(self._openai_translate_segment_batch([segment["text"] for segment, _ in batch]) for batch in batches))
+        
+        for batch, translated in zip(batches, results):
+            if translated is None:
+                logging.warning(f"Dávku {len(batch)} segmentov sa nepodarilo spracovať, prekladám po segmentoch")
+                fallback = await asyncio.gather(*(self.translate_text(segment["text"]) for segment, _ in batch))
+                for (segment, _), text in zip(batch, fallback):
+                    segment["text"] = text
+                continue
+            for (segment, _), text in zip(batch, translated):
+                segment["text"] = text
+            await _in_thread(lambda: [translation_cache.store(key, text) for (_, key), text in zip(batch, translated)])
+    
+    async def _openai_translate_segment_batch(self, texts: List[str]) -> Optional[List[str]]:
+        """
+        Preloží dávku segmentov jednou požiadavkou.
+        
+        Returns:
+            Preklady v poradí segmentov alebo None, ak odpoveď nemá všetky značky
+        """
+        # Každý segment na samostatnom riadku so stabilnou značkou [[n]]
+        numbered = "\n".join(f"[[{i}]] {' '.join(str(text).split())}" for i, text in enumerate(texts))
+        
+        await self._openai_rate_limiter.acquire()
+        try:
+            response = await self._chat(
+                model=OPENAI_TRANSLATION_MODEL,
+                messages=[
+                    {"role": "system", "content": "Si prekladateľ špecializujúci sa na preklad z angličtiny do slovenčiny. Dostaneš očíslované segmenty titulkov, každý na samostatnom riadku v tvare [[číslo]] text. Prelož každý segment a zachovaj presne rovnaké značky [[číslo]], rovnaký počet riadkov a poradie. Segmenty nespájaj ani nerozdeľuj a nepridávaj žiadne úvodné frázy ani vysvetlenia."},
+                    {"role": "user", "content": numbered}
+                ],
+                temperature=0.3,
+                max_tokens=4000
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.error(f"Chyba pri dávkovom preklade segmentov: {e}")
+            return None
+        
+        if getattr(response.choices[0], "finish_reason", None) == "length":
+            self._completion_text(response, "translate_segments")
+            return None
+        
+        translated = {}
+        for match in _SEGMENT_MARKER.finditer(self._completion_text(response, "translate_segments")):
+            translated[int(match.group(1))] = match.group(2).strip()
+        
+        if len(translated) != len(texts) or any(i not in translated for i in range(len(texts))):
+            return None
+        return [translated[i] for i in range(len(texts))]
+
+
+class TranscriptTranslator:
+    """
+    Synchrónne API prekladača pre Flask handlery a vlákna.
+    Je to tenký obal nad AsyncTranscriptTranslator - korutiny bežia v zdieľanej
+    slučke na pozadí, takže aj synchrónne volania zdieľajú limity a spojenia.
+    """
+    
+    def __init__(self, aio: AsyncTranscriptTranslator):
+        self.aio = aio
+    
+    @property
+    def openai_available(self) -> bool:
+        return self.aio.openai_available
+    
+    @property
+    def truncated_outputs(self) -> Dict[str, int]:
+        return self.aio.truncated_outputs
+    
+    def is_available(self) -> bool:
+        """Vráti True, ak je aspoň jeden prekladač dostupný."""
+        return self.aio.is_available()
+    
+    def translate_text(self, text: str) -> str:
+        """Preloží text z angličtiny do slovenčiny."""
+        return background_loop.run(self.aio.translate_text(text))
+    
+    def summarize_text(self, text: str) -> str:
+        """Sumarizuje text pomocou OpenAI API."""
+        return background_loop.run(self.aio.summarize_text(text))
+    
+    def detailed_summarize_text(self, text: str) -> str:
+        """Vytvorí podrobnú sumarizáciu textu pomocou OpenAI API s limitom 4000 tokenov."""
+        return background_loop.run(self.aio.detailed_summarize_text(text))
+    
+    def stream_summary(self, text: str, detailed: bool = False) -> Iterator[str]:
+        """Sumarizuje text a vracia odpoveď po častiach (pozri AsyncTranscriptTranslator.stream_summary)."""
+        return background_loop.iterate(self.aio.stream_summary(text, detailed))
+    
+    def text_to_speech(self, text: str, voice: str = "alloy", style: str = "default") -> Optional[bytes]:
+        """Prevádza text na reč pomocou OpenAI API."""
+        return background_loop.run(self.aio.text_to_speech(text, voice, style))
+    
+    def iter_speech(self, text: str, voice: str = "alloy", style: str = "default") -> Iterator[bytes]:
+        """Prevedie text na reč po častiach (pozri AsyncTranscriptTranslator.iter_speech)."""
+        return background_loop.iterate(self.aio.iter_speech(text, voice, style))
+    
+    def translate_transcript(self, transcript: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Preloží všetky textové časti transkriptu."""
+        return background_loop.run(self.aio.translate_transcript(transcript))
 
 
-# Inicializácia globálneho prekladača
-translator = TranscriptTranslator() 
\ No newline at end of file
+# Inicializácia globálneho prekladača - asynchrónne API pre event loopy, synchrónne pre vlákna
+async_translator = AsyncTranscriptTranslator()
+translator = TranscriptTranslator(async_translator)
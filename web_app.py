@@ -3,17 +3,30 @@
 
 import logging
 import asyncio
-from flask import Flask, render_template, request, flash, session, redirect, url_for, jsonify, make_response
+from flask import Flask, render_template, request, flash, session, redirect, url_for, jsonify, make_response, Response, stream_with_context, send_file
 try:
     from config import YOUTUBE_TRANSCRIPT_API_TOKEN # Importujeme len token
 except ImportError:
     YOUTUBE_TRANSCRIPT_API_TOKEN = None # Fallback pre nasadenie
-from transcript_utils import extract_video_id, get_transcript, get_transcript_sync # Importujeme funkcie z nového modulu
-from translator import translator # Pridaný import prekladača
+from transcript_utils import extract_video_id, extract_video_ids, get_transcript, get_transcript_sync, get_cached_transcript, iter_transcripts, batch_stats, Transcript, MAX_BATCH_VIDEOS # Importujeme funkcie z nového modulu
+import transcript_cache
+import translation_cache
+import audio_cache
+import background_loop
+import telegram_delivery
+from single_flight import flight
+from job_queue import jobs, DONE, FAILED, PRIORITY_NORMAL, PRIORITY_LOW
+from translator import translator, chunk_summary_cache, AVAILABLE_VOICES, VOICE_STYLES # Pridaný import prekladača
 import time  # Pridaný import pre timestamp
 import datetime  # Pre formátovanie dátumu
-import requests  # Pre HTTP požiadavky na Telegram API
 import os  # Pre prácu so súbormi
+import json  # Pre Server-Sent Events
+import io  # Pre odoslanie audia z pamäte
+
+try:
+    from gtts import gTTS
+except ImportError:
+    gTTS = None
 
 # Použijeme condicionálny import pre asyncio
 try:
@@ -36,6 +49,15 @@ app.secret_key = os.environ.get('SECRET_KEY', 'nejake_velmi_tajne_heslo') # Pou
 f1_translations = []
 MAX_F1_TRANSLATIONS = 20  # Maximálny počet prekladov, ktoré sa uložia
 
+# Počet segmentov transkriptu v jednej udalosti streamu
+STREAM_CHUNK_SEGMENTS = int(os.environ.get('STREAM_CHUNK_SEGMENTS', 200))
+
+# Spustiť pracovné vlákna fronty úloh hneď pri štarte (len pre dlho bežiaci server, nie serverless)
+JOB_AUTOSTART = os.environ.get('JOB_AUTOSTART', '0') == '1'
+# Ako dlho najviac drží stream /jobs/<id>/events worker, potom sa klient pýta na /jobs/<id>
+JOB_EVENTS_MAX_SECONDS = float(os.environ.get('JOB_EVENTS_MAX_SECONDS', 60))
+JOB_EVENTS_POLL_INTERVAL = float(os.environ.get('JOB_EVENTS_POLL_INTERVAL', 2))
+
 # Filter pre formátovanie Unix timestamp na čitateľný dátum
 @app.template_filter('datetime')
 def format_datetime(value):
@@ -54,131 +76,132 @@ def index():
     
     return render_template('index.html', history=session['history'], f1_translations=f1_translations)
 
-# Spracovanie formulára
-@app.route('/process', methods=['POST'])
-def process_url():
-    """Spracuje odoslaný YouTube URL."""
-    youtube_url = request.form.get('youtube_url')
+def load_transcript(video_id):
+    """
+    Získa a spracuje transkript pre zadané video ID.
     
+    Returns:
+        Dvojica (Transcript, None) alebo (None, chybová správa)
+    """
+    # Získanie transkriptu - upravený spôsob volánia pre asynchrónnu funkciu
+    if asyncio:
+        # Asyncio je dostupné, korutinu pošleme do zdieľanej slučky na pozadí
+        transcript_data = background_loop.run(get_transcript(video_id))
+    else:
+        # Asyncio nie je dostupné, musíme použiť synchrónnu alternatívu
+        transcript_data = get_transcript_sync(video_id)
+
+    if not transcript_data:
+        return None, "Nepodarilo sa získať transkript. Video možno nemá titulky alebo nastala chyba API."
+
+    # Spracovanie transkriptu zdieľaným parserom
+    transcript = Transcript.from_response(transcript_data, video_id)
+
+    if not len(transcript):
+        return None, "Transkript bol získaný, ale neobsahuje žiadne textové segmenty."
+    if not transcript.text.strip():
+        return None, "Transkript neobsahuje žiadny čitateľný text."
+    return transcript, None
+
+def add_to_history(youtube_url, video_id, transcript_text):
+    """Pridá video na začiatok histórie v session (názov sa vytvorí z prvých slov transkriptu)."""
+    # Získaj názov videa pre históriu z prvých slov transkriptu
+    # Vyberieme prvých 5-8 slov na vytvorenie výstižného názvu
+    words = transcript_text[:1000].split()
+    if len(words) > 8:
+        video_title = " ".join(words[:8]) + "..."
+    else:
+        video_title = " ".join(words) + "..."
+    
+    # Obmedzíme dĺžku názvu na max 50 znakov
+    if len(video_title) > 50:
+        video_title = video_title[:47] + "..."
+    
+    # Pridaj do histórie
+    if 'history' not in session:
+        session['history'] = []
+    
+    # Kontrola, či už URL nie je v histórii
+    for item in session['history']:
+        if item['url'] == youtube_url:
+            # Ak áno, odstráň ho (neskôr pridáme na začiatok)
+            session['history'].remove(item)
+            break
+    
+    # Pridaj nový záznam na začiatok histórie
+    new_entry = {
+        'url': youtube_url,
+        'video_id': video_id,
+        'title': video_title
+    }
+    
+    # Pridaj na začiatok a obmedz dĺžku histórie na 10 položiek
+    session['history'].insert(0, new_entry)
+    if len(session['history']) > 10:
+        session['history'] = session['history'][:10]
+    
+    # Aktualizuj session
+    session.modified = True
+
+def validate_youtube_url(youtube_url):
+    """
+    Overí zadanú URL a extrahuje z nej video ID.
+    
+    Returns:
+        Dvojica (video ID, None) alebo (None, chybová správa)
+    """
     if not youtube_url:
-        flash("Prosím, zadajte YouTube URL.", "error")
-        return render_template('index.html', history=session.get('history', []), f1_translations=f1_translations)
+        return None, "Prosím, zadajte YouTube URL."
 
     # Kontrola, či ide o YouTube URL (jednoduchá)
     if "youtube" not in youtube_url and "youtu.be" not in youtube_url:
-        flash("Zadaný text nevyzerá ako platná YouTube URL.", "error")
-        return render_template('index.html', submitted_url=youtube_url, history=session.get('history', []), f1_translations=f1_translations)
+        return None, "Zadaný text nevyzerá ako platná YouTube URL."
 
     # Extrahovanie Video ID
     video_id = extract_video_id(youtube_url)
     if not video_id:
-        flash("Nepodarilo sa extrahovať Video ID z URL. Skontrolujte odkaz.", "error")
+        return None, "Nepodarilo sa extrahovať Video ID z URL. Skontrolujte odkaz."
+    return video_id, None
+
+# Spracovanie formulára
+@app.route('/process', methods=['POST'])
+def process_url():
+    """Spracuje odoslaný YouTube URL."""
+    youtube_url = request.form.get('youtube_url')
+    
+    video_id, error_message = validate_youtube_url(youtube_url)
+    if error_message:
+        flash(error_message, "error")
         return render_template('index.html', submitted_url=youtube_url, history=session.get('history', []), f1_translations=f1_translations)
 
     logger.info(f"Spracovávam Video ID: {video_id}")
     
     transcript_text = ""
-    error_message = None
     
     try:
-        # Získanie transkriptu - upravený spôsob volánia pre asynchrónnu funkciu
-        if asyncio:
-            # Asyncio je dostupné, použijeme asyncio.run()
-            transcript_data = asyncio.run(get_transcript(video_id))
-        else:
-            # Asyncio nie je dostupné, musíme použiť synchrónnu alternatívu
-            transcript_data = get_transcript_sync(video_id)
-
-        if not transcript_data:
-            error_message = "Nepodarilo sa získať transkript. Video možno nemá titulky alebo nastala chyba API."
-        else:
-            # Spracovanie transkriptu (podobne ako v botovi, ale zjednodušené)
-            transcript_segments = []
-            if isinstance(transcript_data, dict):
-                 # Skúšame nájsť transkript v odpovedi
-                for vid_id, video_data in transcript_data.items():
-                    if isinstance(video_data, dict) and "transcript" in video_data:
-                        transcript = video_data["transcript"]
-                        transcript_segments.extend(transcript)
-                        break
-            elif isinstance(transcript_data, list):
-                for item in transcript_data:
-                    if isinstance(item, dict):
-                        if "tracks" in item and isinstance(item["tracks"], list) and len(item["tracks"]) > 0:
-                            for track in item["tracks"]:
-                                if "transcript" in track and isinstance(track["transcript"], list):
-                                    transcript_segments.extend(track["transcript"])
-                                    break # Predpokladáme, že prvý nájdený je ten správny
-                        elif "transcript" in item and isinstance(item["transcript"], list):
-                            transcript_segments.extend(item["transcript"])
-
-            if not transcript_segments:
-                 error_message = "Transkript bol získaný, ale neobsahuje žiadne textové segmenty."
-            else:
-                # Zostavenie textu
-                for segment in transcript_segments:
-                    if isinstance(segment, dict) and "text" in segment:
-                        transcript_text += segment["text"] + " "
-                
-                transcript_text = transcript_text.strip()
-
-                if not transcript_text:
-                    error_message = "Transkript neobsahuje žiadny čitateľný text."
-                else:
-                    # Voliteľný preklad:
-                    enable_translation = False # Nastav na True, ak chceš prekladať
-                    if enable_translation and translator.is_available():
-                        logger.info("Prekladám text...")
-                        try:
-                           translated = translator.translate_text(transcript_text)
-                           if translated: # Skontroluj, či preklad vrátil nejaký text
-                               transcript_text = translated
-                           else:
-                               logger.warning("Preklad vrátil prázdny reťazec, použije sa originálny text.")
-                        except Exception as translate_err:
-                            logger.error(f"Chyba pri preklade: {translate_err}")
-                            flash("Nastala chyba počas prekladu textu.", "warning") # Informuj užívateľa
-                    elif enable_translation and not translator.is_available():
-                        logger.warning("Prekladač nie je dostupný (deep-translator nie je nainštalovaný?), vraciam originálny text.")
-                        flash("Preklad nie je dostupný.", "warning")
-
-                    # Získaj názov videa pre históriu z prvých slov transkriptu
-                    # Vyberieme prvých 5-8 slov na vytvorenie výstižného názvu
-                    words = transcript_text.split()
-                    if len(words) > 8:
-                        video_title = " ".join(words[:8]) + "..."
-                    else:
-                        video_title = " ".join(words) + "..."
-                    
-                    # Obmedzíme dĺžku názvu na max 50 znakov
-                    if len(video_title) > 50:
-                        video_title = video_title[:47] + "..."
-                    
-                    # Pridaj do histórie
-                    if 'history' not in session:
-                        session['history'] = []
-                    
-                    # Kontrola, či už URL nie je v histórii
-                    for item in session['history']:
-                        if item['url'] == youtube_url:
-                            # Ak áno, odstráň ho (neskôr pridáme na začiatok)
-                            session['history'].remove(item)
-                            break
-                    
-                    # Pridaj nový záznam na začiatok histórie
-                    new_entry = {
-                        'url': youtube_url,
-                        'video_id': video_id,
-                        'title': video_title
-                    }
-                    
-                    # Pridaj na začiatok a obmedz dĺžku histórie na 10 položiek
-                    session['history'].insert(0, new_entry)
-                    if len(session['history']) > 10:
-                        session['history'] = session['history'][:10]
-                    
-                    # Aktualizuj session
-                    session.modified = True
+        transcript, error_message = load_transcript(video_id)
+
+        if transcript is not None:
+            transcript_text = transcript.text.strip()
+
+            # Voliteľný preklad:
+            enable_translation = False # Nastav na True, ak chceš prekladať
+            if enable_translation and translator.is_available():
+                logger.info("Prekladám text...")
+                try:
+                   translated = translator.translate_text(transcript_text)
+                   if translated: # Skontroluj, či preklad vrátil nejaký text
+                       transcript_text = translated
+                   else:
+                       logger.warning("Preklad vrátil prázdny reťazec, použije sa originálny text.")
+                except Exception as translate_err:
+                    logger.error(f"Chyba pri preklade: {translate_err}")
+                    flash("Nastala chyba počas prekladu textu.", "warning") # Informuj užívateľa
+            elif enable_translation and not translator.is_available():
+                logger.warning("Prekladač nie je dostupný (deep-translator nie je nainštalovaný?), vraciam originálny text.")
+                flash("Preklad nie je dostupný.", "warning")
+
+            add_to_history(youtube_url, video_id, transcript_text)
 
     except Exception as e:
         logger.error(f"Chyba pri spracovaní URL {youtube_url} (Video ID: {video_id}): {e}", exc_info=True)
@@ -189,6 +212,106 @@ def process_url():
         
     return render_template('index.html', transcript=transcript_text, submitted_url=youtube_url, history=session.get('history', []), f1_translations=f1_translations)
 
+def sse_event(event, data):
+    """Naformátuje jednu udalosť pre Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# Streamované spracovanie - stránka sa zobrazí hneď a text prichádza po častiach
+@app.route('/process/stream', methods=['GET'])
+def process_url_stream():
+    """
+    Získa transkript a posiela jeho segmenty po dávkach ako Server-Sent Events.
+    Odpoveď sa vráti hneď a udalosť "start" príde ešte pred získaním transkriptu;
+    históriu (session cookie) potom stránka uloží cez POST /history.
+    """
+    youtube_url = request.args.get('youtube_url')
+    video_id, error_message = validate_youtube_url(youtube_url)
+
+    def generate():
+        if error_message:
+            yield sse_event("failure", {"message": error_message})
+            return
+
+        logger.info(f"Streamujem Video ID: {video_id}")
+        yield sse_event("start", {"video_id": video_id})
+        try:
+            # API vracia jeden JSON dokument, segmenty môžeme posielať až po jeho spracovaní
+            transcript, load_error = load_transcript(video_id)
+        except Exception as e:
+            logger.error(f"Chyba pri spracovaní URL {youtube_url} (Video ID: {video_id}): {e}", exc_info=True)
+            transcript, load_error = None, f"Nastala neočakávaná chyba pri spracovaní: {e}"
+        if load_error:
+            yield sse_event("failure", {"message": load_error})
+            return
+
+        total = len(transcript)
+        yield sse_event("progress", {"segments": total})
+        for first in range(0, total, STREAM_CHUNK_SEGMENTS):
+            last = min(first + STREAM_CHUNK_SEGMENTS, total)
+            # Text dávky je len výrez zo spojeného textu transkriptu
+            text = transcript.text[transcript.offsets[first]:transcript.offsets[last]]
+            yield sse_event("segments", {"text": text, "start": transcript.starts[first], "done": last})
+        yield sse_event("done", {"segments": total})
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Vypne buffering v nginx proxy
+    return response
+
+# Uloženie do histórie po streamovanom spracovaní (stream už nemôže meniť session cookie)
+@app.route('/history', methods=['POST'])
+def save_history():
+    """Pridá video do histórie; transkript sa berie len z cache, kam ho uložil stream."""
+    youtube_url = request.form.get('youtube_url') or (request.get_json(silent=True) or {}).get('youtube_url')
+    video_id, error_message = validate_youtube_url(youtube_url)
+    if error_message:
+        return jsonify({"error": error_message}), 400
+
+    transcript_data = get_cached_transcript(video_id)
+    if transcript_data is None:
+        return jsonify({"error": "Transkript nie je v cache."}), 404
+    add_to_history(youtube_url, video_id, Transcript.from_response(transcript_data, video_id).text)
+    return jsonify({"history": session['history']})
+
+# Dávkové spracovanie viacerých videí naraz
+@app.route('/process/batch', methods=['POST'])
+def process_batch():
+    """
+    Získa transkripty všetkých videí zo zoznamu odkazov alebo voľného textu.
+    Očakáva JSON {"urls": [...]} alebo {"text": "..."}; odpoveď je stream riadkov JSON,
+    jeden za každé video v poradí, v akom sú hotové, nakoniec {"done": true}.
+    """
+    data = request.get_json(silent=True) or {}
+    urls = data.get('urls')
+    text = "\n".join(urls) if isinstance(urls, list) else (data.get('text') or request.form.get('youtube_urls', ''))
+
+    video_ids = extract_video_ids(text)
+    if not video_ids:
+        return jsonify({"error": "V požiadavke sa nenašiel žiadny YouTube odkaz."}), 400
+    if len(video_ids) > MAX_BATCH_VIDEOS:
+        return jsonify({"error": f"Naraz je možné spracovať najviac {MAX_BATCH_VIDEOS} videí (požiadavka obsahuje {len(video_ids)})."}), 400
+
+    logger.info(f"Dávkovo spracovávam {len(video_ids)} videí")
+
+    def generate():
+        # Videá sa sťahujú súbežne v slučke na pozadí, každé sa pošle hneď, ako je hotové
+        failed = 0
+        for video_id, transcript_data in background_loop.iterate(iter_transcripts(video_ids)):
+            item = {"video_id": video_id}
+            transcript = Transcript.from_response(transcript_data, video_id) if transcript_data else None
+            if transcript is not None and transcript.text.strip():
+                item.update(text=transcript.text, segments=len(transcript))
+            else:
+                failed += 1
+                item["error"] = "Nepodarilo sa získať transkript. Video možno nemá titulky alebo nastala chyba API."
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+        yield json.dumps({"done": True, "videos": len(video_ids), "failed": failed}) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Vypne buffering v nginx proxy
+    return response
+
 # Nový endpoint pre F1 prekladače
 @app.route('/f1translator/receive', methods=['POST'])
 def receive_f1_translation():
@@ -244,6 +367,38 @@ def get_f1_translations():
         "count": len(f1_translations)
     })
 
+# API pre štatistiky cache transkriptov
+@app.route('/api/cache_stats', methods=['GET'])
+def get_cache_stats():
+    """Vráti počítadlá zásahov cache, zoskupovania a zlúčených volaní."""
+    return jsonify({
+        "transcripts": transcript_cache.stats(),
+        "translations": translation_cache.stats(),
+        "chunk_summaries": chunk_summary_cache.stats(),
+        "audio": audio_cache.stats(),
+        "jobs": jobs.stats(),
+        "telegram": telegram_delivery.stats(),
+        "transcript_batching": batch_stats(),
+        "single_flight": flight.stats(),
+        "truncated_outputs": translator.truncated_outputs
+    })
+
+def stream_summary_response(text, detailed):
+    """Vráti sumarizáciu ako stream riadkov JSON ({"delta"}, nakoniec {"done"} alebo {"error"})."""
+    def generate():
+        try:
+            for delta in translator.stream_summary(text, detailed=detailed):
+                yield json.dumps({"delta": delta}, ensure_ascii=False) + "\n"
+            yield json.dumps({"done": True}) + "\n"
+        except Exception as e:
+            logger.error(f"Chyba pri streamovanej sumarizácii textu: {e}", exc_info=True)
+            yield json.dumps({"error": f"Nastala chyba pri sumarizácii: {str(e)}"}, ensure_ascii=False) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Vypne buffering v nginx proxy
+    return response
+
 # Endpoint pre sumarizáciu textu
 @app.route('/summarize', methods=['POST'])
 def summarize():
@@ -257,6 +412,14 @@ def summarize():
         if not text or len(text.strip()) < 10:
             return jsonify({"error": "Text je príliš krátky na sumarizáciu."}), 400
         
+        # Pri stream=true posielame text sumarizácie priebežne, ako ho model generuje
+        if data.get('stream'):
+            return stream_summary_response(text, detailed=False)
+        
+        # Pri background=true sa sumarizácia vykoná vo fronte úloh a klient sa dopytuje na /jobs/<id>
+        if data.get('background'):
+            return enqueue_job('summarize', {"text": text, "detailed": False})
+        
         # Zavoláme funkciu na sumarizáciu z prekladača
         summary = translator.summarize_text(text)
         
@@ -284,6 +447,13 @@ def detailed_summarize():
         if not text or len(text.strip()) < 10:
             return jsonify({"error": "Text je príliš krátky na podrobnú sumarizáciu."}), 400
         
+        # Pri stream=true posielame text sumarizácie priebežne, ako ho model generuje
+        if data.get('stream'):
+            return stream_summary_response(text, detailed=True)
+        
+        if data.get('background'):
+            return enqueue_job('summarize', {"text": text, "detailed": True})
+        
         # Zavoláme funkciu na podrobnú sumarizáciu z prekladača
         summary = translator.detailed_summarize_text(text)
         
@@ -298,6 +468,74 @@ def detailed_summarize():
         logger.error(f"Chyba pri podrobnej sumarizácii textu: {e}", exc_info=True)
         return jsonify({"error": f"Nastala chyba pri podrobnej sumarizácii: {str(e)}"}), 500
 
+def send_audio(audio_data):
+    """Vráti hotové MP3 ako súbor na stiahnutie s podporou HTTP Range (posúvanie v prehrávači)."""
+    return send_file(
+        io.BytesIO(audio_data),
+        mimetype='audio/mpeg',
+        as_attachment=True,
+        download_name='podcast.mp3',
+        conditional=True
+    )
+
+def stream_gtts_speech(text, voice, cache_key):
+    """
+    Vráti MP3 z gTTS ako chunked stream - každá časť textu sa posiela hneď po syntéze.
+    Celé audio sa po dokončení uloží do cache, odkiaľ sa už servíruje s podporou Range.
+    """
+    parts = gTTS(text=text, lang=voice, slow=False).stream()
+    # Prvú časť vygenerujeme ešte pred odoslaním hlavičiek, aby chyba mohla vrátiť 500
+    first_part = next(parts, b"")
+
+    def generate():
+        audio_parts = [first_part]
+        yield first_part
+        try:
+            for part in parts:
+                audio_parts.append(part)
+                yield part
+        except Exception as e:
+            # Hlavičky sú už odoslané, stream môžeme len ukončiť
+            logger.error(f"Chyba pri streamovaní reči: {e}", exc_info=True)
+            return
+        audio_cache.store(cache_key, b"".join(audio_parts))
+
+    response = Response(stream_with_context(generate()), mimetype='audio/mpeg')
+    response.headers.set('Content-Disposition', 'attachment', filename='podcast.mp3')
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+def validate_openai_voice(voice, style):
+    """Overí hlas a štýl OpenAI TTS; vráti chybovú správu alebo None."""
+    if voice not in AVAILABLE_VOICES:
+        return f"Neplatný hlas. Povolené hodnoty: {', '.join(AVAILABLE_VOICES)}"
+    if style not in VOICE_STYLES:
+        return f"Neplatný štýl. Povolené hodnoty: {', '.join(VOICE_STYLES)}"
+    return None
+
+def stream_openai_speech(text, voice, style):
+    """Vráti MP3 z OpenAI TTS ako stream - časti sa posielajú v poradí, ako sú hotové."""
+    if not translator.openai_available:
+        return jsonify({"error": "Text-to-speech cez OpenAI nie je dostupný."}), 503
+    if not text.strip():
+        return jsonify({"error": "Chýba text na prevod"}), 400
+    # Neznámy hlas by iter_speech potichu nahradil predvoleným
+    error_message = validate_openai_voice(voice, style)
+    if error_message:
+        return jsonify({"error": error_message}), 400
+
+    def generate():
+        try:
+            yield from translator.iter_speech(text, voice, style)
+        except Exception as e:
+            # Hlavičky sú už odoslané, stream môžeme len ukončiť
+            logger.error(f"Chyba pri streamovaní reči: {e}", exc_info=True)
+
+    response = Response(stream_with_context(generate()), mimetype='audio/mpeg')
+    response.headers.set('Content-Disposition', 'attachment', filename='podcast.mp3')
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 # Endpoint pre text-to-speech
 @app.route('/text_to_speech', methods=['POST'])
 def text_to_speech():
@@ -308,49 +546,77 @@ def text_to_speech():
             return jsonify({"error": "Chýba text na prevod"}), 400
 
         text = data.get('text', '')
-        voice = data.get('voice', 'sk')  # Predvolene slovenčina
-        style = data.get('style', 'standard')  # Predvolený štýl 
-
-        # Základné overenie hlasu a štýlu
-        valid_voices = ["sk", "cs", "en"]
-        valid_styles = ["standard", "news", "calm", "cheerful", "excited", "friendly", "hopeful", "sad", "shouting", "unfriendly", "whispering"]
-        
-        if voice not in valid_voices:
-            return jsonify({"error": f"Neplatný hlas. Povolené hodnoty: {', '.join(valid_voices)}"}), 400
         
-        if style not in valid_styles:
-            return jsonify({"error": f"Neplatný štýl. Povolené hodnoty: {', '.join(valid_styles)}"}), 400
+        engine = data.get('engine', 'gtts')
+        if engine == 'openai':
+            voice = data.get('voice', 'alloy')
+            style = data.get('style', 'slovak')
+            error_message = validate_openai_voice(voice, style)
+            if error_message:
+                return jsonify({"error": error_message}), 400
+        else:
+            voice = data.get('voice', 'sk')  # Predvolene slovenčina
+            style = data.get('style', 'standard')  # Predvolený štýl 
 
-        # Použitie gTTS na prevod textu na reč
-        from gtts import gTTS
-        import tempfile
-        
-        # Vytvoríme dočasný súbor
-        temp_file = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False)
-        temp_file.close()
-        
-        # Prevedieme text na reč
-        tts = gTTS(text=text, lang=voice, slow=False)
-        tts.save(temp_file.name)
-        
-        # Príprava odpovede
-        with open(temp_file.name, 'rb') as f:
-            audio_data = f.read()
-        
-        # Odstránime dočasný súbor
-        os.unlink(temp_file.name)
-        
-        # Vrátime audio ako súbor na stiahnutie
-        response = make_response(audio_data)
-        response.headers.set('Content-Type', 'audio/mpeg')
-        response.headers.set('Content-Disposition', 'attachment', filename='podcast.mp3')
-        
-        return response
+            # Základné overenie hlasu a štýlu (aj pre úlohu na pozadí, aby zlý vstup vrátil 400)
+            valid_voices = ["sk", "cs", "en"]
+            valid_styles = ["standard", "news", "calm", "cheerful", "excited", "friendly", "hopeful", "sad", "shouting", "unfriendly", "whispering"]
+            
+            if voice not in valid_voices:
+                return jsonify({"error": f"Neplatný hlas. Povolené hodnoty: {', '.join(valid_voices)}"}), 400
+            
+            if style not in valid_styles:
+                return jsonify({"error": f"Neplatný štýl. Povolené hodnoty: {', '.join(valid_styles)}"}), 400
+        
+        if data.get('background'):
+            return enqueue_job('text_to_speech', {
+                "text": text,
+                "engine": engine,
+                "voice": voice,
+                "style": style
+            })
+        
+        # OpenAI TTS generuje dlhý text po častiach súbežne - prvú časť posielame hneď, ako je hotová
+        if engine == 'openai':
+            return stream_openai_speech(text, voice, style)
+
+        # Rovnaký text s rovnakým hlasom už mohol byť vygenerovaný
+        cache_key = audio_cache.audio_key(text, "gtts", voice, style, "gtts")
+        audio_data = audio_cache.lookup(cache_key)
+        if audio_data is not None:
+            logger.info("Audio vrátené z cache")
+            return send_audio(audio_data)
+        
+        if gTTS is None:
+            return jsonify({"error": "Text-to-speech cez gTTS nie je dostupný."}), 503
+        
+        return stream_gtts_speech(text, voice, cache_key)
     
     except Exception as e:
         logger.error(f"Chyba pri prevode textu na reč: {e}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+def deliver_podcast(text, voice, style, chat_id):
+    """
+    Vygeneruje podcast a odošle ho do Telegram chatu.
+
+    Returns:
+        JSON odpoveď Telegram API; None, ak sa nepodarilo vytvoriť audio
+    """
+    # Zavoláme funkciu na prevod textu na reč z prekladača
+    audio_data = translator.text_to_speech(text, voice, style)
+    
+    if not audio_data:
+        return None
+    
+    # Audio sa nahrá priamo z pamäte, opakovaný podcast sa pošle podľa uloženého file_id
+    return telegram_delivery.send_audio(
+        chat_id,
+        audio_data,
+        caption="Podcast vygenerovaný z transkriptu YouTube videa",
+        title="YouTube podcast"
+    )
+
 # Nový endpoint pre odoslanie audio súboru do Telegram bota
 @app.route('/send_podcast_to_telegram', methods=['POST'])
 def send_podcast_to_telegram():
@@ -380,47 +646,14 @@ def send_podcast_to_telegram():
         if style not in available_styles:
             style = "slovak"  # Predvolený štýl
         
-        # Telegram bot token
-        TELEGRAM_BOT_TOKEN = "7835385356:AAECh9m0uwk9gTySrZRKD_k7HFpdRZM0Mco"
-        
-        # Zavoláme funkciu na prevod textu na reč z prekladača
-        audio_data = translator.text_to_speech(text, voice, style)
+        if data.get('background'):
+            return enqueue_job('send_podcast', {"text": text, "voice": voice, "style": style, "chat_id": chat_id})
         
-        if not audio_data:
+        telegram_response = deliver_podcast(text, voice, style, chat_id)
+        if telegram_response is None:
             return jsonify({"error": "Nepodarilo sa vytvoriť hlasovú nahrávku."}), 500
-            
-        # Dočasne uložíme súbor
-        temp_file_path = "temp_podcast.mp3"
-        with open(temp_file_path, "wb") as f:
-            f.write(audio_data)
-        
-        # Odošleme audio súbor do Telegram bota
-        files = {
-            'audio': ('podcast.mp3', open(temp_file_path, 'rb'), 'audio/mpeg')
-        }
-        
-        caption = "Podcast vygenerovaný z transkriptu YouTube videa"
-        
-        # Odoslanie audio súboru cez Telegram Bot API
-        telegram_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendAudio"
-        response = requests.post(
-            telegram_url,
-            data={
-                'chat_id': chat_id,
-                'caption': caption,
-                'title': 'YouTube podcast'
-            },
-            files=files
-        )
-        
-        # Zmažeme dočasný súbor
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
         
-        # Skontrolujeme odpoveď z Telegram API
-        telegram_response = response.json()
-        
-        if response.status_code == 200 and telegram_response.get('ok'):
+        if telegram_response.get('ok'):
             logger.info(f"Podcast úspešne odoslaný do Telegram bota (chat_id: {chat_id})")
             return jsonify({
                 "success": True,
@@ -440,6 +673,128 @@ def send_podcast_to_telegram():
         logger.error(f"Chyba pri odosielaní podcastu do Telegram bota: {e}", exc_info=True)
         return jsonify({"error": f"Nastala chyba pri odosielaní podcastu: {str(e)}"}), 500
 
+def enqueue_job(kind, payload):
+    """Zaradí úlohu do fronty a vráti 202 s adresou, kde sa dá sledovať jej stav."""
+    priority = PRIORITY_LOW if kind == 'send_podcast' else PRIORITY_NORMAL
+    job_id = jobs.submit(kind, payload, priority)
+    return jsonify({
+        "job_id": job_id,
+        "status_url": url_for('get_job', job_id=job_id),
+        "events_url": url_for('stream_job_events', job_id=job_id)
+    }), 202
+
+def run_summary_job(payload, progress):
+    """Úloha fronty: (podrobná) sumarizácia textu."""
+    progress(0.1, "Sumarizujem text")
+    if payload.get("detailed"):
+        summary = translator.detailed_summarize_text(payload["text"])
+    else:
+        summary = translator.summarize_text(payload["text"])
+    if not summary:
+        raise RuntimeError("Nepodarilo sa vytvoriť sumarizáciu.")
+    return {"summary": summary}
+
+def run_speech_job(payload, progress):
+    """Úloha fronty: prevod textu na reč, výsledkom je MP3."""
+    text = payload["text"]
+    progress(0.1, "Generujem audio")
+    if payload.get("engine") == 'openai':
+        audio_data = translator.text_to_speech(text, payload.get("voice") or 'alloy', payload.get("style") or 'slovak')
+    else:
+        voice = payload.get("voice") or 'sk'
+        cache_key = audio_cache.audio_key(text, "gtts", voice, payload.get("style") or 'standard', "gtts")
+        audio_data = audio_cache.lookup(cache_key)
+        if audio_data is None:
+            if gTTS is None:
+                raise RuntimeError("Text-to-speech cez gTTS nie je dostupný.")
+            audio_data = b"".join(gTTS(text=text, lang=voice, slow=False).stream())
+            audio_cache.store(cache_key, audio_data)
+    if not audio_data:
+        raise RuntimeError("Nepodarilo sa vytvoriť hlasovú nahrávku.")
+    return audio_data
+
+def run_podcast_job(payload, progress):
+    """Úloha fronty: vygenerovanie podcastu a odoslanie do Telegramu."""
+    progress(0.1, "Generujem a odosielam podcast")
+    telegram_response = deliver_podcast(payload["text"], payload["voice"], payload["style"], payload["chat_id"])
+    if telegram_response is None:
+        raise RuntimeError("Nepodarilo sa vytvoriť hlasovú nahrávku.")
+    if not telegram_response.get('ok'):
+        raise RuntimeError(f"Chyba pri odosielaní podcastu: {telegram_response.get('description', 'Neznáma chyba')}")
+    return {"success": True, "telegram_response": telegram_response}
+
+jobs.register('summarize', run_summary_job)
+jobs.register('text_to_speech', run_speech_job)
+jobs.register('send_podcast', run_podcast_job)
+# Inak sa vlákna spustia až pri prvom prístupe k fronte (submit/get)
+if JOB_AUTOSTART:
+    # Úlohy čakajúce z predchádzajúceho behu sa spracujú hneď, nie až pri ďalšom submit()
+    jobs.start()
+
+def job_status(job_id):
+    """Vráti stav úlohy, pri binárnom výsledku s adresou na jeho stiahnutie."""
+    job = jobs.get(job_id)
+    if job is not None and job["has_result"] and job["result_type"] != 'application/json':
+        job["result_url"] = url_for('get_job_result', job_id=job_id)
+    return job
+
+# Stav úlohy z fronty
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Vráti stav úlohy; JSON výsledok je priamo v odpovedi, audio na /jobs/<id>/result."""
+    job = job_status(job_id)
+    if job is None:
+        return jsonify({"error": "Úloha neexistuje."}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Vráti výsledok dokončenej úlohy (audio s podporou Range)."""
+    result, result_type = jobs.result(job_id)
+    if result is None:
+        return jsonify({"error": "Výsledok úlohy nie je k dispozícii."}), 404
+    if result_type == 'audio/mpeg':
+        return send_audio(result)
+    return Response(result, mimetype=result_type)
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def stream_job_events(job_id):
+    """
+    Server-Sent Events so stavom úlohy, kým sa nedokončí.
+    Stream trvá najviac JOB_EVENTS_MAX_SECONDS, potom pošle udalosť "timeout"
+    s adresou, na ktorej sa má klient ďalej pýtať na stav.
+    """
+    if jobs.get(job_id) is None:
+        return jsonify({"error": "Úloha neexistuje."}), 404
+    status_url = url_for('get_job', job_id=job_id)
+
+    def generate():
+        last = None
+        deadline = time.monotonic() + JOB_EVENTS_MAX_SECONDS
+        while True:
+            job = job_status(job_id)
+            if job is None:
+                yield sse_event("failure", {"error": "Úloha neexistuje."})
+                return
+            state = (job["status"], job["progress"], job["message"], job.get("position"))
+            if state != last:
+                yield sse_event("progress", job)
+                last = state
+            if job["status"] in (DONE, FAILED):
+                yield sse_event("done" if job["status"] == DONE else "failure", job)
+                return
+            if time.monotonic() >= deadline:
+                yield sse_event("timeout", {"status_url": status_url})
+                return
+            # Komentár slúži ako heartbeat, aby proxy nezavrela nečinné spojenie
+            yield ": heartbeat\n\n"
+            time.sleep(JOB_EVENTS_POLL_INTERVAL)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 # Prezbrojovanie histórie - opätovné spracovanie URL z histórie
 @app.route('/replay/<video_id>', methods=['GET'])
 def replay_from_history(video_id):
@@ -483,29 +838,19 @@ def get_telegram_chat_id():
         if not username:
             return jsonify({"error": "Používateľské meno nemôže byť prázdne."}), 400
         
-        # Telegram bot token
-        TELEGRAM_BOT_TOKEN = "7835385356:AAECh9m0uwk9gTySrZRKD_k7HFpdRZM0Mco"
-        
         # Kontrola, či je to platný formát Telegram mena alebo ID
         if username.startswith('@'):
             # Je to používateľské meno
             username = username[1:]  # Odstránime @ zo začiatku
         
-        # Skúsime pomocou getChat API metódy získať ID
-        telegram_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/getChat"
-        
+        # Skúsime pomocou getChat API metódy získať ID (úspešné odpovede sú v cache)
         # Skúsime najprv ako chat_id (ak je to číselná hodnota)
         try_as_id = username.lstrip('-')
         if try_as_id.isdigit():
             # Ak je to číslo (ID), skúsime priamo ako chat_id
-            response = requests.post(
-                telegram_url,
-                data={"chat_id": username}
-            )
-            
-            telegram_response = response.json()
+            telegram_response = telegram_delivery.get_chat(username)
             
-            if response.status_code == 200 and telegram_response.get('ok'):
+            if telegram_response.get('ok'):
                 chat_info = telegram_response.get('result', {})
                 chat_id = chat_info.get('id')
                 chat_type = chat_info.get('type')
@@ -520,14 +865,9 @@ def get_telegram_chat_id():
                 }), 200
         
         # Skúsime ako používateľské meno
-        response = requests.post(
-            telegram_url,
-            data={"chat_id": f"@{username}"}
-        )
+        telegram_response = telegram_delivery.get_chat(f"@{username}")
         
-        telegram_response = response.json()
-        
-        if response.status_code == 200 and telegram_response.get('ok'):
+        if telegram_response.get('ok'):
             chat_info = telegram_response.get('result', {})
             chat_id = chat_info.get('id')
             chat_type = chat_info.get('type')
@@ -570,6 +910,12 @@ def get_telegram_chat_id():
         logger.error(f"Chyba pri získavaní Telegram Chat ID: {e}", exc_info=True)
         return jsonify({"error": f"Nastala chyba pri získavaní Chat ID: {str(e)}"}), 500
 
+# Voliteľný webhook Telegram bota v rovnakom procese ako web (BOT_WEBHOOK_IN_FLASK=1)
+if os.environ.get('BOT_WEBHOOK_IN_FLASK'):
+    import bot_webhook
+    from youtube_transcript_bot import build_application
+    bot_webhook.attach_to_flask(app, build_application)
+
 # WSGI handler pre Vercel - TOTO TREBA PRE VERCEL
 app = app 
 
@@ -1,16 +1,21 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
 import logging
-import re
-import requests
+import asyncio
 import base64
 import json
 import openai
+from collections import OrderedDict
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
-from config import TELEGRAM_BOT_TOKEN, YOUTUBE_TRANSCRIPT_API_TOKEN
-from translator import translator
+from telegram.ext import Application, BaseUpdateProcessor, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler
+from telegram.error import RetryAfter
+from translator import async_translator
+from transcript_utils import get_cached_transcript, extract_video_ids, iter_transcripts, Transcript, MAX_BATCH_VIDEOS
+import http_client
+from telegram_delivery import ChatRateLimiter, TELEGRAM_GLOBAL_RATE, TELEGRAM_MAX_RETRIES
+from fair_scheduler import FairScheduler
 
 # Nastavenie logovania
 logging.basicConfig(
@@ -19,6 +24,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Token bota - najprv z prostredia, potom z config.py
+TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN')
+if not TELEGRAM_BOT_TOKEN:
+    from config import TELEGRAM_BOT_TOKEN
+
+# Režim behu a súbežnosť spracovania aktualizácií
+BOT_MODE = os.environ.get('BOT_MODE', 'polling')  # polling alebo webhook
+BOT_CONCURRENT_UPDATES = int(os.environ.get('BOT_CONCURRENT_UPDATES', 32))
+# Koľko ďalších aktualizácií jedného chatu môže čakať, kým sa jeho staršie spracúvajú (nadbytočné sa zahodia)
+BOT_MAX_QUEUED_PER_CHAT = int(os.environ.get('BOT_MAX_QUEUED_PER_CHAT', 20))
+# Sťahovanie transkriptov a sumarizácia: sloty spolu a najviac úloh jedného chatu naraz
+BOT_SCHEDULER_WORKERS = int(os.environ.get('BOT_SCHEDULER_WORKERS', 8))
+BOT_PER_CHAT_CONCURRENCY = int(os.environ.get('BOT_PER_CHAT_CONCURRENCY', 1))
+# Voliteľná adresa Bot API (napr. lokálny fake_telegram.py)
+TELEGRAM_API_BASE_URL = os.environ.get('TELEGRAM_API_BASE_URL', '').rstrip('/')
+
+# Doručenie dlhých transkriptov: "auto" (súbor nad BOT_MAX_MESSAGE_PARTS správ), "messages" alebo "document"
+MAX_MESSAGE_LENGTH = 4000  # Upravená hodnota podľa oficiálneho limitu Telegram API (4096 znakov)
+BOT_DELIVERY_MODE = os.environ.get('BOT_DELIVERY_MODE', 'auto')
+BOT_MAX_MESSAGE_PARTS = int(os.environ.get('BOT_MAX_MESSAGE_PARTS', 3))
+BOT_DOCUMENT_FORMAT = os.environ.get('BOT_DOCUMENT_FORMAT', 'txt')  # txt alebo srt
+
+# Limity pamäte transkriptov pre sumarizáciu
+BOT_TRANSCRIPTS_PER_USER = int(os.environ.get('BOT_TRANSCRIPTS_PER_USER', 5))
+BOT_TRANSCRIPT_STORE_MB = int(os.environ.get('BOT_TRANSCRIPT_STORE_MB', 50))
+
 # Načítanie OpenAI API kľúča z config.ini
 def load_openai_api_key():
     import configparser
@@ -36,71 +67,146 @@ openai.api_key = load_openai_api_key()
 
 # Funkcia na sumarizáciu textu cez OpenAI API
 async def summarize_text(text):
-    """Sumarizuje text pomocou OpenAI API."""
+    """Sumarizuje text pomocou OpenAI API bez blokovania event loopu bota."""
     try:
-        # Použitie sumarizácie z modulu translator
-        return translator.summarize_text(text)
+        # Použitie asynchrónnej sumarizácie z modulu translator
+        return await async_translator.summarize_text(text)
     except Exception as e:
         logger.error(f"Chyba pri sumarizácii textu: {e}")
         return f"Chyba pri sumarizácii textu: {str(e)}"
 
-# Funkcia na získanie ID videa z YouTube URL
-def extract_video_id(url):
-    """Extrahuje YouTube video ID z rôznych formátov URL."""
-    youtube_regex = (
-        r'(https?://)?(www\.)?'
-        r'(youtube|youtu|youtube-nocookie)\.(com|be)/'
-        r'(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
-    )
-    
-    match = re.match(youtube_regex, url)
-    if match:
-        return match.group(6)
-    return None
-
-# Funkcia na získanie transkriptu cez API
-async def get_transcript(video_id):
-    """Získa transkript YouTube videa cez API."""
-    url = "https://www.youtube-transcript.io/api/transcripts"
-    
-    # Použitie API tokenu tak, ako je odporúčané na webstránke API dokumentácie
-    headers = {
-        "Authorization": f"Basic {YOUTUBE_TRANSCRIPT_API_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    payload = {"ids": [video_id]}
-    
-    try:
-        logger.info(f"Odosielam požiadavku na API pre video ID: {video_id}")
-        logger.info(f"Používam API token: {YOUTUBE_TRANSCRIPT_API_TOKEN[:5]}...")
-        logger.info(f"Payload: {payload}")
-        
-        response = requests.post(url, headers=headers, json=payload)
-        
-        # Zalogujeme status kód a odpoveď pre debugovanie
-        logger.info(f"API status kód: {response.status_code}")
-        logger.info(f"API odpoveď hlavičky: {response.headers}")
-        
-        # Skúsime získať odpoveď aj v prípade chyby
-        try:
-            response_data = response.json()
-            logger.info(f"API raw odpoveď: {json.dumps(response_data)[:500]}...")
-        except Exception as e:
-            logger.error(f"Nepodarilo sa spracovať odpoveď ako JSON: {e}")
-            logger.info(f"Raw odpoveď: {response.text[:500]}...")
-        
-        # Skontrolujeme odpoveď
-        response.raise_for_status()
-        data = response.json()
-        
-        # Skontrolujeme, či odpoveď má očakávaný formát
-        logger.info(f"Odpoveď z API prijatá, typ odpovede: {type(data)}")
-        
-        return data
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Chyba pri získavaní transkriptu: {e}")
+class TranscriptStore:
+    """
+    Ohraničená LRU pamäť transkriptov pre tlačidlo sumarizácie.
+    Drží najviac max_per_user videí na používateľa a max_bytes textu spolu; čo sa
+    vyhodí, sa pri potrebe znova načíta zo zdieľanej cache transkriptov na disku.
+    """
+
+    def __init__(self, max_bytes, max_per_user):
+        self.max_bytes = max_bytes
+        self.max_per_user = max_per_user
+        self._entries = OrderedDict()  # (user_id, video_id) -> text
+        self._sizes = {}
+        self._per_user = {}
+        self._bytes = 0
+
+    def put(self, user_id, video_id, text):
+        """Uloží transkript používateľa a vyhodí najdlhšie nepoužité záznamy nad limitmi."""
+        key = (user_id, video_id)
+        if key in self._entries:
+            self._remove(key)
+
+        size = len(text.encode('utf-8'))
+        self._entries[key] = text
+        self._sizes[key] = size
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+        self._bytes += size
+
+        if self._per_user[user_id] > self.max_per_user:
+            oldest = next(k for k in self._entries if k[0] == user_id)
+            self._remove(oldest)
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+
+    async def get(self, user_id, video_id):
+        """Vráti text transkriptu; ak už nie je v pamäti, skúsi zdieľanú cache (vo vlákne, nie v event loope)."""
+        key = (user_id, video_id)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        text = await asyncio.get_running_loop().run_in_executor(None, self._load_text, video_id)
+        if text and text.strip():
+            self.put(user_id, video_id, text)
+            return text
         return None
 
+    @staticmethod
+    def _load_text(video_id):
+        """Načíta a rozbalí transkript zo zdieľanej cache (SQLite, zlib, JSON)."""
+        transcript_data = get_cached_transcript(video_id)
+        if transcript_data is None:
+            return None
+        return Transcript.from_response(transcript_data, video_id).text
+
+    def _remove(self, key):
+        del self._entries[key]
+        self._bytes -= self._sizes.pop(key)
+        self._per_user[key[0]] -= 1
+        if not self._per_user[key[0]]:
+            del self._per_user[key[0]]
+
+# Tempo odosielania správ podľa limitov Telegramu (na chat aj celkovo pre bota)
+message_limiter = ChatRateLimiter(TELEGRAM_GLOBAL_RATE)
+
+# Volania YouTube a OpenAI sa prideľujú chatom striedavo, aby dávka odkazov od jedného
+# používateľa nespomalila ostatných
+scheduler = FairScheduler(max_workers=BOT_SCHEDULER_WORKERS, per_key_limit=BOT_PER_CHAT_CONCURRENCY)
+
+# Sloty na spracovanie aktualizácií: jeden chat naraz najviac jedna (zachová poradie jeho správ),
+# voľné sloty sa prideľujú chatom striedavo
+update_scheduler = FairScheduler(max_workers=BOT_CONCURRENT_UPDATES, per_key_limit=1)
+
+
+class ChatUpdateProcessor(BaseUpdateProcessor):
+    """
+    Spracovanie aktualizácií férovo podľa chatu.
+    Predvolený procesor PTB drží slot počas celého handlera a prideľuje ich v poradí príchodu,
+    takže jeden chat s 32 správami by obsadil všetky. Semafor PTB je preto len horná hranica
+    čakajúcich aktualizácií a skutočné sloty prideľuje update_scheduler.
+    """
+
+    async def do_process_update(self, update, coroutine):
+        chat = getattr(update, "effective_chat", None)
+        # Aktualizácie bez chatu (napr. inline dopyty) sa navzájom neblokujú
+        key = chat.id if chat is not None else ("update", id(update))
+        if update_scheduler.depth(key) >= BOT_MAX_QUEUED_PER_CHAT:
+            logger.warning(f"Chat {key} má {BOT_MAX_QUEUED_PER_CHAT} čakajúcich aktualizácií, ďalšiu zahadzujem")
+            coroutine.close()
+            return
+        await update_scheduler.run(key, lambda: coroutine)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+transcript_store = TranscriptStore(
+    max_bytes=BOT_TRANSCRIPT_STORE_MB * 1024 * 1024,
+    max_per_user=BOT_TRANSCRIPTS_PER_USER
+)
+
+async def send_paced(chat_id, send):
+    """
+    Odošle správu v rámci limitov Telegramu pre daný chat.
+    Ak Telegram aj tak odpovie RetryAfter, počká požadovaný čas a skúsi to znova.
+    """
+    for attempt in range(TELEGRAM_MAX_RETRIES + 1):
+        await message_limiter.acquire(chat_id)
+        try:
+            return await send()
+        except RetryAfter as e:
+            if attempt == TELEGRAM_MAX_RETRIES:
+                raise
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+            logger.warning(f"Telegram obmedzil odosielanie do chatu {chat_id}, čakám {retry_after} s")
+            message_limiter.penalize(chat_id, retry_after)
+
+async def send_transcript_document(update: Update, transcript, video_id, reply_markup):
+    """Pošle celý transkript ako jeden .txt alebo .srt súbor vygenerovaný v pamäti."""
+    if BOT_DOCUMENT_FORMAT == "srt":
+        content, filename = transcript.to_srt(), f"{video_id}.srt"
+    else:
+        content, filename = transcript.text, f"{video_id}.txt"
+    
+    await send_paced(update.effective_chat.id, lambda: update.message.reply_document(
+        document=content.encode("utf-8"),
+        filename=filename,
+        caption=f"Transkript je dlhý ({len(transcript.text)} znakov), posielam ho ako súbor.",
+        reply_markup=reply_markup
+    ))
+
 # Telegram príkazy
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Odošle správu pri spustení príkazu /start."""
@@ -114,197 +220,130 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         'Jednoducho pošli odkaz na YouTube video a ja ti pošlem jeho prepis v slovenčine.'
     )
 
+async def queue_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Odošle stav front: správy tohto chatu, spracovanie správ a volania služieb."""
+    updates = update_scheduler.stats()
+    stats = scheduler.stats()
+    await update.message.reply_text(
+        f"Tvoje čakajúce správy: {update_scheduler.depth(update.effective_chat.id)}\n"
+        f"Spracúvané správy: {updates['active']}/{updates['workers']}, čakajúce: {updates['queued']} "
+        f"(chaty: {updates['keys_waiting']}, najdlhšia fronta: {updates['max_queue_depth']}, "
+        f"priemerné čakanie: {updates['avg_wait_ms']} ms)\n"
+        f"Bežiace úlohy: {stats['active']}/{stats['workers']}\n"
+        f"Čakajúce úlohy spolu: {stats['queued']} (chaty: {stats['keys_waiting']}, najdlhšia fronta: {stats['max_queue_depth']})\n"
+        f"Priemerné čakanie: {stats['avg_wait_ms']} ms"
+    )
+
 async def process_youtube_url(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Spracuje YouTube odkaz a vráti transkript."""
+    """Spracuje všetky YouTube odkazy zo správy a pošle ich transkripty, ako sú hotové."""
     message_text = update.message.text
     
     # Kontrola, či správa obsahuje "youtube" alebo "youtu.be"
     if "youtube" not in message_text and "youtu.be" not in message_text:
         return
     
-    # Získanie ID videa
-    video_id = extract_video_id(message_text)
-    if not video_id:
+    # Získanie všetkých ID videí zo správy (bez duplicít)
+    video_ids = extract_video_ids(message_text)
+    if not video_ids:
         await update.message.reply_text("Nepodarilo sa extrahovať ID videa. Prosím, skontroluj odkaz.")
         return
+    if len(video_ids) > MAX_BATCH_VIDEOS:
+        await update.message.reply_text(f"Správa obsahuje {len(video_ids)} videí, spracujem prvých {MAX_BATCH_VIDEOS}.")
+        video_ids = video_ids[:MAX_BATCH_VIDEOS]
+    
+    chat_id = update.effective_chat.id
+    what = "transkript" if len(video_ids) == 1 else f"transkripty {len(video_ids)} videí"
+    await update.message.reply_text(f"Získavam {what}, čakaj prosím...")
+    
+    # Všetky videá sa sťahujú naraz (jedna požiadavka s viacerými ID) v poradí férovom
+    # k ostatným chatom; každý transkript sa posiela hneď, ako je k dispozícii
+    label = len(video_ids) > 1
+    deliveries = []
     
-    await update.message.reply_text("Získavam transkript, čakaj prosím...")
+    async def fetch_all():
+        async for video_id, transcript_data in iter_transcripts(video_ids):
+            deliveries.append(asyncio.ensure_future(
+                send_video_transcript(update, video_id, transcript_data, label)
+            ))
+    
+    await scheduler.run(chat_id, fetch_all)
+    await asyncio.gather(*deliveries)
+
+async def send_video_transcript(update: Update, video_id, transcript_data, label=False):
+    """
+    Spracuje odpoveď API pre jedno video a pošle jeho transkript do chatu.
+    
+    Args:
+        label: True, ak správa obsahovala viac videí (hlásenia sa označia ID videa)
+    """
+    chat_id = update.effective_chat.id
+    prefix = f"🎬 {video_id}: " if label else ""
     
-    # Získanie transkriptu
-    transcript_data = await get_transcript(video_id)
     if not transcript_data:
-        await update.message.reply_text("Nepodarilo sa získať transkript. Video možno nemá titulky alebo nastala chyba.")
+        await update.message.reply_text(f"{prefix}Nepodarilo sa získať transkript. Video možno nemá titulky alebo nastala chyba.")
         return
     
     logger.info(f"Získaný transcript_data: {type(transcript_data)}")
     
     try:
-        # Spracovanie transkriptu
-        transcript_text = ""
-        transcript_segments = []
-        
-        # Logujeme pre debug
-        logger.info(f"Typ transcript_data: {type(transcript_data)}")
-        if isinstance(transcript_data, dict):
-            logger.info(f"Kľúče v dict: {transcript_data.keys()}")
-        elif isinstance(transcript_data, list):
-            logger.info(f"Dĺžka listu: {len(transcript_data)}")
-            if len(transcript_data) > 0:
-                logger.info(f"Prvý prvok: {transcript_data[0]}")
-        
-        # Upravené spracovanie odpovede z API - očakávame, že môže vrátiť buď dict alebo list
-        if isinstance(transcript_data, dict):
-            # Pre prípad, že API vracia dict
-            if video_id in transcript_data:
-                # Odpoveď vo formáte {"video_id": {"transcript": [...]}}
-                video_data = transcript_data[video_id]
-                if isinstance(video_data, dict) and "transcript" in video_data:
-                    transcript = video_data["transcript"]
-                    transcript_segments.extend(transcript)
-            else:
-                # Skúšame nájsť prvý kľúč, ktorý obsahuje transkript
-                for vid_id, video_data in transcript_data.items():
-                    if isinstance(video_data, dict) and "transcript" in video_data:
-                        transcript = video_data["transcript"]
-                        transcript_segments.extend(transcript)
-                        break
-        elif isinstance(transcript_data, list):
-            # Pre prípad, že API vracia list
-            for item in transcript_data:
-                if isinstance(item, dict):
-                    # Skontrolujeme, či item obsahuje "tracks" pole s transkriptom
-                    if "tracks" in item and isinstance(item["tracks"], list) and len(item["tracks"]) > 0:
-                        for track in item["tracks"]:
-                            if "transcript" in track and isinstance(track["transcript"], list):
-                                transcript_segments.extend(track["transcript"])
-                                logger.info(f"Našiel som transkript v tracks!")
-                                break
-                    # Alebo skontrolujeme, či položka sama obsahuje transkript
-                    elif "transcript" in item and isinstance(item["transcript"], list):
-                        transcript_segments.extend(item["transcript"])
-        else:
+        # Kontrola formátu odpovede - očakávame, že API môže vrátiť buď dict alebo list
+        if not isinstance(transcript_data, (dict, list)):
             # Ak API vráti úplne iný formát, zalogujeme to pre debug
             logger.error(f"Neočakávaný formát odpovede: {type(transcript_data)}")
-            await update.message.reply_text("Nastala chyba pri spracovaní transkriptu (neznámy formát odpovede).")
+            await update.message.reply_text(f"{prefix}Nastala chyba pri spracovaní transkriptu (neznámy formát odpovede).")
             return
         
+        # Spracovanie transkriptu zdieľaným parserom (neplatné segmenty sa preskočia)
+        transcript = Transcript.from_response(transcript_data, video_id)
+        
         # Kontrola, či máme nejaké segmenty
-        if not transcript_segments:
+        if not len(transcript):
             logger.warning("Transkript neobsahuje žiadne segmenty.")
-            await update.message.reply_text("Transkript neobsahuje žiadny text.")
-            return
-        
-        logger.info(f"Počet segmentov: {len(transcript_segments)}")
-        logger.info(f"Prvý segment: {transcript_segments[0] if transcript_segments else 'žiadny'}")
-        
-        # Teraz skontrolujeme, či segmenty majú správny formát
-        valid_segments = []
-        for segment in transcript_segments:
-            if isinstance(segment, dict) and "text" in segment:
-                valid_segments.append(segment)
-            else:
-                logger.warning(f"Ignorujem neplatný segment: {segment}")
-        
-        if not valid_segments:
-            logger.warning("Žiadne platné segmenty s textom.")
-            await update.message.reply_text("Nepodarilo sa nájsť žiadny text v transkripte.")
+            await update.message.reply_text(f"{prefix}Transkript neobsahuje žiadny text.")
             return
         
-        transcript_segments = valid_segments
+        logger.info(f"Počet segmentov: {len(transcript)}")
         
         # Informácia o získaní transkriptu
-        await update.message.reply_text("Transkript získaný, posielam text...")
+        await update.message.reply_text(f"{prefix}Transkript získaný, posielam text...")
         
-        # Zostavenie textu transkriptu bez prekladu
-        for segment in transcript_segments:
-            if "text" in segment:
-                transcript_text += segment["text"] + " "
+        transcript_text = transcript.text
         
         # Kontrola, či máme nejaký text
         if not transcript_text.strip():
             logger.warning("Po spracovaní segmentov je výsledný text prázdny.")
-            await update.message.reply_text("Nepodarilo sa extrahovať text z transkriptu.")
+            await update.message.reply_text(f"{prefix}Nepodarilo sa extrahovať text z transkriptu.")
             return
         
         logger.info(f"Dĺžka výsledného textu: {len(transcript_text)}")
         
-        # Uloženie transkriptu do kontextu pre prípadnú sumarizáciu
-        if not hasattr(context.user_data, "transcripts"):
-            context.user_data["transcripts"] = {}
-        context.user_data["transcripts"][video_id] = transcript_text
+        # Uloženie transkriptu pre prípadnú sumarizáciu
+        transcript_store.put(update.effective_user.id, video_id, transcript_text)
         
-        # Rozdelenie transkriptu na menšie časti ak je príliš dlhý
-        max_message_length = 4000  # Upravená hodnota podľa oficiálneho limitu Telegram API (4096 znakov)
-        if len(transcript_text) <= max_message_length:
-            # Pridáme tlačidlo pre sumarizáciu
-            keyboard = [
-                [InlineKeyboardButton("📝 Sumarizovať", callback_data=f"summarize_{video_id}")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            
-            await update.message.reply_text(transcript_text, reply_markup=reply_markup)
+        # Tlačidlo pre sumarizáciu pridáme k poslednej odoslanej správe
+        keyboard = [
+            [InlineKeyboardButton("📝 Sumarizovať", callback_data=f"summarize_{video_id}")]
+        ]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        # Rozdelenie transkriptu na hraniciach segmentov (miesto pre hlavičku "Časť i/n" a ID videa)
+        chunks = transcript.split_text(MAX_MESSAGE_LENGTH - 40)
+        
+        if len(chunks) <= 1:
+            await send_paced(chat_id, lambda: update.message.reply_text(transcript_text, reply_markup=reply_markup))
+        elif BOT_DELIVERY_MODE == "document" or (BOT_DELIVERY_MODE == "auto" and len(chunks) > BOT_MAX_MESSAGE_PARTS):
+            # Dlhý transkript pošleme ako jeden súbor namiesto desiatok správ
+            await send_transcript_document(update, transcript, video_id, reply_markup)
         else:
             # Odošleme informáciu o tom, že odpoveď bude rozdelená na viacero častí
-            await update.message.reply_text(f"Transkript je dlhý ({len(transcript_text)} znakov), posielam ho po častiach.")
-            
-            # Rozdelíme text na menšie časti, ale rešpektujeme celé vety
-            chunks = []
-            current_chunk = ""
-            
-            # Rozdelíme text na vety
-            sentences = re.split(r'([.!?]\s+)', transcript_text)
-            
-            # Spájame vety, až kým nedosiahneme limit
-            for i in range(0, len(sentences), 2):
-                sentence = sentences[i]
-                # Pridáme aj interpunkciu a medzeru, ak existuje
-                if i + 1 < len(sentences):
-                    sentence += sentences[i + 1]
-                
-                # Ak by pridanie novej vety prekročilo limit, vytvoríme nový chunk
-                if len(current_chunk + sentence) > max_message_length:
-                    if current_chunk:
-                        chunks.append(current_chunk)
-                        current_chunk = sentence
-                    else:
-                        # Ak je samotná veta dlhšia než limit, musíme ju rozdeliť
-                        if len(sentence) > max_message_length:
-                            words = sentence.split()
-                            temp_chunk = ""
-                            for word in words:
-                                if len(temp_chunk + " " + word) > max_message_length:
-                                    chunks.append(temp_chunk)
-                                    temp_chunk = word
-                                else:
-                                    temp_chunk += " " + word if temp_chunk else word
-                            if temp_chunk:
-                                current_chunk = temp_chunk
-                        else:
-                            current_chunk = sentence
-                else:
-                    current_chunk += sentence
+            await send_paced(chat_id, lambda: update.message.reply_text(f"{prefix}Transkript je dlhý ({len(transcript_text)} znakov), posielam ho po častiach."))
             
-            # Pridáme posledný chunk, ak existuje
-            if current_chunk:
-                chunks.append(current_chunk)
-            
-            # Odošleme jednotlivé časti
+            # Odošleme jednotlivé časti - tempo určujú limity Telegramu, nie pevná pauza
             for i, chunk in enumerate(chunks):
+                text = f"{prefix}Časť {i+1}/{len(chunks)}:\n\n{chunk}"
+                markup = reply_markup if i == len(chunks) - 1 else None
                 try:
-                    # Pre poslednú časť pridáme tlačidlo sumarizácie
-                    if i == len(chunks) - 1:
-                        keyboard = [
-                            [InlineKeyboardButton("📝 Sumarizovať", callback_data=f"summarize_{video_id}")]
-                        ]
-                        reply_markup = InlineKeyboardMarkup(keyboard)
-                        await update.message.reply_text(f"Časť {i+1}/{len(chunks)}:\n\n{chunk}", reply_markup=reply_markup)
-                    else:
-                        await update.message.reply_text(f"Časť {i+1}/{len(chunks)}:\n\n{chunk}")
-                    
-                    # Pridáme malú pauzu medzi správami, aby sme nepreťažili API
-                    if i < len(chunks) - 1:
-                        import asyncio
-                        await asyncio.sleep(0.5)
+                    await send_paced(chat_id, lambda: update.message.reply_text(text, reply_markup=markup))
                 except Exception as e:
                     logger.error(f"Chyba pri odosielaní časti {i+1}: {e}")
                     await update.message.reply_text(f"Nastala chyba pri odosielaní časti {i+1}. Skúste požiadať o kratší úsek videa.")
@@ -312,7 +351,7 @@ async def process_youtube_url(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     except Exception as e:
         logger.error(f"Chyba pri spracovaní transkriptu: {e}", exc_info=True)
-        await update.message.reply_text("Nastala chyba pri spracovaní transkriptu.")
+        await update.message.reply_text(f"{prefix}Nastala chyba pri spracovaní transkriptu.")
 
 async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Spracovanie tlačidla pre sumarizáciu."""
@@ -323,19 +362,17 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if query.data.startswith("summarize_"):
         video_id = query.data.replace("summarize_", "")
         
-        # Kontrola, či máme uložený transkript pre toto video
-        if not hasattr(context.user_data, "transcripts") or video_id not in context.user_data["transcripts"]:
+        # Získanie uloženého transkriptu pre toto video
+        transcript_text = await transcript_store.get(update.effective_user.id, video_id)
+        if transcript_text is None:
             await query.edit_message_text(text="Nemám k dispozícii transkript pre toto video.")
             return
         
-        # Získanie transkriptu
-        transcript_text = context.user_data["transcripts"][video_id]
-        
         # Informujeme používateľa, že prebiehka sumarizácia
         await query.edit_message_text(text="Sumarizujem transkript, čakaj prosím...")
         
         # Sumarizácia textu
-        summary = await summarize_text(transcript_text)
+        summary = await scheduler.run(update.effective_chat.id, lambda: summarize_text(transcript_text))
         
         # Odoslanie sumarizovaného textu
         if len(summary) <= 4000:
@@ -347,19 +384,45 @@ async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             if len(summary) > 4000:
                 await query.message.reply_text(summary[4000:])
 
-def main():
-    """Spustí bota."""
-    # Vytvorenie aplikácie
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+async def close_http_clients(application: Application):
+    """Zatvorí zdieľané HTTP spojenia pri vypnutí bota."""
+    await http_client.close_async_session()
+    http_client.close_session()
+
+def build_application(webhook=False):
+    """
+    Vytvorí aplikáciu bota s handlermi.
+    
+    Args:
+        webhook: True, ak aktualizácie doručuje webhook (bez vlastného pollingu)
+    """
+    builder = Application.builder().token(TELEGRAM_BOT_TOKEN).post_shutdown(close_http_clients)
+    # Aktualizácie od rôznych chatov sa spracúvajú súbežne, najviac BOT_CONCURRENT_UPDATES naraz
+    # a férovo medzi chatmi; semafor PTB obmedzuje len počet čakajúcich aktualizácií
+    builder = builder.concurrent_updates(ChatUpdateProcessor(BOT_CONCURRENT_UPDATES * BOT_MAX_QUEUED_PER_CHAT))
+    if TELEGRAM_API_BASE_URL:
+        builder = builder.base_url(f"{TELEGRAM_API_BASE_URL}/bot").base_file_url(f"{TELEGRAM_API_BASE_URL}/file/bot")
+    if webhook:
+        builder = builder.updater(None)
+    application = builder.build()
 
     # Pridanie handleriv
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
+    application.add_handler(CommandHandler("queue", queue_command))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, process_youtube_url))
     application.add_handler(CallbackQueryHandler(button_callback))
+    return application
+
+def main():
+    """Spustí bota (BOT_MODE=polling alebo webhook)."""
+    if BOT_MODE == "webhook":
+        import bot_webhook
+        bot_webhook.run_server(build_application(webhook=True))
+        return
 
     # Spustenie bota
-    application.run_polling()
+    build_application().run_polling()
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()